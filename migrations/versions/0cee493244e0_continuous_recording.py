@@ -0,0 +1,33 @@
+"""camera_settings.continuous_recording
+
+Revision ID: 0cee493244e0
+Revises: 108ad282cc0b
+Create Date: 2026-10-18 10:00:00
+
+Databases built by db.create_all() from the current models already have
+this column; it is only added where missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0cee493244e0'
+down_revision = '108ad282cc0b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'camera_settings' not in inspector.get_table_names():
+        return  # db.create_all() builds it from the current model
+    existing = {column['name'] for column in inspector.get_columns('camera_settings')}
+    if 'continuous_recording' not in existing:
+        op.add_column('camera_settings', sa.Column('continuous_recording', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    with op.batch_alter_table('camera_settings') as batch_op:
+        batch_op.drop_column('continuous_recording')
@@ -0,0 +1,33 @@
+"""alert.clip_path
+
+Revision ID: 108ad282cc0b
+Revises: 2d12aa2915a8
+Create Date: 2026-10-18 10:00:00
+
+Databases built by db.create_all() from the current models already have
+this column; it is only added where missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '108ad282cc0b'
+down_revision = '2d12aa2915a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'alert' not in inspector.get_table_names():
+        return  # db.create_all() builds it from the current model
+    existing = {column['name'] for column in inspector.get_columns('alert')}
+    if 'clip_path' not in existing:
+        op.add_column('alert', sa.Column('clip_path', sa.String(255)))
+
+
+def downgrade():
+    with op.batch_alter_table('alert') as batch_op:
+        batch_op.drop_column('clip_path')
@@ -0,0 +1,36 @@
+"""camera_settings.motion_scale and motion_min_area
+
+Revision ID: 15e5071abf1b
+Revises:
+Create Date: 2026-10-18 10:00:00
+
+Databases built by db.create_all() from the current models already have
+these columns; they are only added where missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '15e5071abf1b'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'camera_settings' not in inspector.get_table_names():
+        return  # db.create_all() builds it from the current model
+    existing = {column['name'] for column in inspector.get_columns('camera_settings')}
+    if 'motion_scale' not in existing:
+        op.add_column('camera_settings', sa.Column('motion_scale', sa.Integer(), nullable=False, server_default='4'))
+    if 'motion_min_area' not in existing:
+        op.add_column('camera_settings', sa.Column('motion_min_area', sa.Integer(), nullable=False, server_default='200'))
+
+
+def downgrade():
+    with op.batch_alter_table('camera_settings') as batch_op:
+        batch_op.drop_column('motion_min_area')
+        batch_op.drop_column('motion_scale')
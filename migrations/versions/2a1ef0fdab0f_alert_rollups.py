@@ -0,0 +1,42 @@
+"""alert_rollups table
+
+Revision ID: 2a1ef0fdab0f
+Revises: 3243a700b555
+Create Date: 2026-10-18 10:00:00
+
+Skipped when db.create_all() has already built the table. The rollups are
+filled from the existing alerts by `flask backfill-rollups`, or by the web
+app on its first start with an empty rollup table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a1ef0fdab0f'
+down_revision = '3243a700b555'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'alert_rollups' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'alert_rollups',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('period', sa.String(4), nullable=False),
+        sa.Column('bucket', sa.DateTime(), nullable=False),
+        sa.Column('camera', sa.String(50), nullable=False, server_default=''),
+        sa.Column('location', sa.String(100), nullable=False, server_default=''),
+        sa.Column('severity', sa.String(20), nullable=False, server_default=''),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('period', 'bucket', 'camera', 'location', 'severity', name='uq_alert_rollups_key'),
+    )
+    op.create_index('ix_alert_rollups_period_bucket', 'alert_rollups', ['period', 'bucket'])
+
+
+def downgrade():
+    op.drop_index('ix_alert_rollups_period_bucket', table_name='alert_rollups')
+    op.drop_table('alert_rollups')
@@ -0,0 +1,33 @@
+"""camera_settings.motion_backend
+
+Revision ID: 2d12aa2915a8
+Revises: 94dc4ed6aff9
+Create Date: 2026-10-18 10:00:00
+
+Databases built by db.create_all() from the current models already have
+this column; it is only added where missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d12aa2915a8'
+down_revision = '94dc4ed6aff9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'camera_settings' not in inspector.get_table_names():
+        return  # db.create_all() builds it from the current model
+    existing = {column['name'] for column in inspector.get_columns('camera_settings')}
+    if 'motion_backend' not in existing:
+        op.add_column('camera_settings', sa.Column('motion_backend', sa.String(20), nullable=False, server_default='mog2'))
+
+
+def downgrade():
+    with op.batch_alter_table('camera_settings') as batch_op:
+        batch_op.drop_column('motion_backend')
@@ -0,0 +1,50 @@
+"""per-user notification policy and notification_outbox.severity
+
+Revision ID: 3243a700b555
+Revises: b84cd9bdfad3
+Create Date: 2026-10-18 10:00:00
+
+Databases built by db.create_all() from the current models already have
+these columns; they are only added where missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3243a700b555'
+down_revision = 'b84cd9bdfad3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'users' in tables:
+        existing = {column['name'] for column in inspector.get_columns('users')}
+        if 'notify_immediate' not in existing:
+            op.add_column('users', sa.Column('notify_immediate', sa.JSON(), nullable=True))
+        if 'digest_minutes' not in existing:
+            op.add_column('users', sa.Column('digest_minutes', sa.Integer(), nullable=True))
+        if 'digest_watermark' not in existing:
+            op.add_column('users', sa.Column('digest_watermark', sa.Integer(), nullable=False, server_default='0'))
+        if 'digest_sent_at' not in existing:
+            op.add_column('users', sa.Column('digest_sent_at', sa.DateTime()))
+
+    if 'notification_outbox' in tables:
+        existing = {column['name'] for column in inspector.get_columns('notification_outbox')}
+        if 'severity' not in existing:
+            op.add_column('notification_outbox', sa.Column('severity', sa.String(20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('notification_outbox') as batch_op:
+        batch_op.drop_column('severity')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('digest_sent_at')
+        batch_op.drop_column('digest_watermark')
+        batch_op.drop_column('digest_minutes')
+        batch_op.drop_column('notify_immediate')
@@ -0,0 +1,33 @@
+"""camera_settings.motion_zones
+
+Revision ID: 94dc4ed6aff9
+Revises: 15e5071abf1b
+Create Date: 2026-10-18 10:00:00
+
+Databases built by db.create_all() from the current models already have
+this column; it is only added where missing.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '94dc4ed6aff9'
+down_revision = '15e5071abf1b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'camera_settings' not in inspector.get_table_names():
+        return  # db.create_all() builds it from the current model
+    existing = {column['name'] for column in inspector.get_columns('camera_settings')}
+    if 'motion_zones' not in existing:
+        op.add_column('camera_settings', sa.Column('motion_zones', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('camera_settings') as batch_op:
+        batch_op.drop_column('motion_zones')
@@ -0,0 +1,175 @@
+"""alert.created_at, alert.camera_id and indexes for the alert API filters
+
+Revision ID: b2d4f6a8c0e2
+Revises: 2a1ef0fdab0f
+Create Date: 2026-10-18 09:30:00
+
+Alert.time is a string, so time filters compare text and cannot use a real
+range index. This adds a DateTime copy and a foreign key to the camera, and
+indexes for the filters /api/alerts uses.
+
+The migration is written to run online against a large alert table:
+
+* the new columns are nullable, so adding them only touches the catalogue;
+* both backfills run in id-range chunks, each committed on its own, so no
+  long transaction holds row locks or bloats the WAL, and a rerun picks up
+  where an interrupted one stopped (only NULLs are filled);
+* on PostgreSQL the foreign key is added NOT VALID and validated afterwards,
+  and the indexes are built CONCURRENTLY, so writers are never blocked.
+
+Limitation: existing alerts only name their camera as "Camera N", and no
+record was kept of which CameraSetting held position N at the time. The
+camera_id backfill is therefore only done when the camera ids run without
+gaps (no camera was ever removed). Otherwise, and for names that match no
+camera, camera_id stays NULL and the number of such alerts is printed.
+Alerts written by the app from this revision on always carry camera_id.
+
+Batch size can be set with ALERT_MIGRATION_BATCH (default 10000 rows).
+
+"""
+import os
+import re
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c0e2'
+down_revision = '2a1ef0fdab0f'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = int(os.getenv('ALERT_MIGRATION_BATCH', 10000))
+
+INDEXES = [
+    ('ix_alert_status_id', ['status', 'id']),
+    ('ix_alert_severity_id', ['severity', 'id']),
+    ('ix_alert_camera_created_at', ['camera', 'created_at']),
+    ('ix_alert_is_true_detection', ['is_true_detection']),
+]
+
+# Rows whose time string is not in the format the app writes are left NULL
+CREATED_AT_BACKFILL = {
+    'postgresql': (
+        "UPDATE alert SET created_at = to_timestamp(time, 'YYYY-MM-DD HH24:MI:SS') "
+        "WHERE id >= :lo AND id < :hi AND created_at IS NULL "
+        "AND time ~ '^[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}$'"
+    ),
+    # SQLAlchemy stores SQLite datetimes as text with microseconds
+    'sqlite': (
+        "UPDATE alert SET created_at = time || '.000000' "
+        "WHERE id >= :lo AND id < :hi AND created_at IS NULL "
+        "AND time GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'"
+    ),
+}
+TIME_FORMAT = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$')
+
+
+def id_batches(bind):
+    """(lo, hi) id ranges covering the alert table, BATCH_SIZE ids at a time."""
+    low, high = bind.execute(sa.text("SELECT MIN(id), MAX(id) FROM alert")).first()
+    if low is None:
+        return
+    for lo in range(low, high + 1, BATCH_SIZE):
+        yield lo, lo + BATCH_SIZE
+
+
+def backfill_created_at(bind):
+    statement = CREATED_AT_BACKFILL.get(bind.dialect.name)
+    for lo, hi in id_batches(bind):
+        if statement is not None:
+            bind.execute(sa.text(statement), {'lo': lo, 'hi': hi})
+            continue
+        rows = bind.execute(
+            sa.text("SELECT id, time FROM alert WHERE id >= :lo AND id < :hi AND created_at IS NULL"),
+            {'lo': lo, 'hi': hi},
+        ).fetchall()
+        updates = [{'id': row.id, 'created_at': datetime.strptime(row.time, '%Y-%m-%d %H:%M:%S')}
+                   for row in rows if row.time and TIME_FORMAT.match(row.time)]
+        if updates:
+            bind.execute(sa.text("UPDATE alert SET created_at = :created_at WHERE id = :id"), updates)
+
+
+def backfill_camera_id(bind):
+    """
+    Links alerts to their camera row.
+
+    Alerts name their camera "Camera N", where N was the camera's position
+    in the settings ordered by id. That position only identifies today's
+    camera if none was ever removed, which is the case when the ids run
+    without gaps from the first one. Otherwise an alert could be linked to
+    the camera that took its position, so every camera_id is left NULL.
+    """
+    camera_ids = [row.id for row in bind.execute(sa.text("SELECT id FROM camera_settings ORDER BY id"))]
+    if camera_ids and camera_ids == list(range(camera_ids[0], camera_ids[0] + len(camera_ids))):
+        statement = sa.text(
+            "UPDATE alert SET camera_id = :camera_id "
+            "WHERE id >= :lo AND id < :hi AND camera_id IS NULL AND camera = :camera"
+        )
+        for lo, hi in id_batches(bind):
+            bind.execute(statement, [{'camera_id': camera_id, 'camera': f'Camera {index}', 'lo': lo, 'hi': hi}
+                                     for index, camera_id in enumerate(camera_ids)])
+        reason = "their camera name matches no current camera"
+    else:
+        reason = "camera ids have gaps, so \"Camera N\" cannot be mapped to a camera reliably"
+
+    unlinked = bind.execute(sa.text("SELECT COUNT(*) FROM alert WHERE camera_id IS NULL")).scalar()
+    if unlinked:
+        print(f"[WARNING] {unlinked} existing alerts were left without camera_id: {reason}")
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+    inspector = sa.inspect(bind)
+    if 'alert' not in inspector.get_table_names():
+        return  # db.create_all() builds it from the current model
+    columns = {column['name'] for column in inspector.get_columns('alert')}
+    foreign_keys = {fk['name'] for fk in inspector.get_foreign_keys('alert')}
+    indexes = {index['name'] for index in inspector.get_indexes('alert')}
+
+    if 'created_at' not in columns:
+        op.add_column('alert', sa.Column('created_at', sa.DateTime(), nullable=True))
+
+    if 'camera_id' not in columns:
+        if dialect == 'sqlite':
+            # SQLite can only add a foreign key together with the column
+            op.execute("ALTER TABLE alert ADD COLUMN camera_id INTEGER "
+                       "REFERENCES camera_settings (id) ON DELETE SET NULL")
+            foreign_keys.add('fk_alert_camera_id')
+        else:
+            op.add_column('alert', sa.Column('camera_id', sa.Integer(), nullable=True))
+
+    if 'fk_alert_camera_id' not in foreign_keys and dialect != 'sqlite':
+        if dialect == 'postgresql':
+            # NOT VALID skips the full-table check under the exclusive lock; VALIDATE runs it without blocking writes
+            op.execute("ALTER TABLE alert ADD CONSTRAINT fk_alert_camera_id FOREIGN KEY (camera_id) "
+                       "REFERENCES camera_settings (id) ON DELETE SET NULL NOT VALID")
+        else:
+            op.create_foreign_key('fk_alert_camera_id', 'alert', 'camera_settings',
+                                  ['camera_id'], ['id'], ondelete='SET NULL')
+
+    # Each chunk and each index build commits on its own
+    with op.get_context().autocommit_block():
+        backfill_created_at(bind)
+        backfill_camera_id(bind)
+        if dialect == 'postgresql' and 'fk_alert_camera_id' not in foreign_keys:
+            op.execute("ALTER TABLE alert VALIDATE CONSTRAINT fk_alert_camera_id")
+        for name, index_columns in INDEXES:
+            if name not in indexes:
+                op.create_index(name, 'alert', index_columns, postgresql_concurrently=True)
+
+
+def downgrade():
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='alert', postgresql_concurrently=True)
+    # SQLite cannot drop the foreign key in place, so the batch mode copies the table
+    with op.batch_alter_table('alert') as batch_op:
+        if bind.dialect.name != 'sqlite':
+            batch_op.drop_constraint('fk_alert_camera_id', type_='foreignkey')
+        batch_op.drop_column('camera_id')
+        batch_op.drop_column('created_at')
@@ -0,0 +1,47 @@
+"""notification_outbox table
+
+Revision ID: b84cd9bdfad3
+Revises: 888daf87d80e
+Create Date: 2026-10-18 10:00:00
+
+Skipped when db.create_all() has already built the table.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b84cd9bdfad3'
+down_revision = '888daf87d80e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'notification_outbox' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'notification_outbox',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('alert_id', sa.Integer(), sa.ForeignKey('alert.id'), nullable=True),
+        sa.Column('channel', sa.String(20), nullable=False, server_default='email'),
+        sa.Column('recipient', sa.String(120), nullable=True),
+        sa.Column('subject', sa.String(200), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('attachment_path', sa.String(255)),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.Column('claim_token', sa.String(36)),
+        sa.Column('claimed_at', sa.DateTime()),
+        sa.Column('last_error', sa.String(255)),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('delivered_at', sa.DateTime()),
+    )
+    op.create_index('ix_notification_outbox_status_next', 'notification_outbox', ['status', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_index('ix_notification_outbox_status_next', table_name='notification_outbox')
+    op.drop_table('notification_outbox')
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Motion Backend Micro-Benchmark
+==============================
+Compares the per-frame cost of the motion backends on synthetic frames so a
+backend can be chosen per site.
+
+Usage:
+    python scripts/benchmark_motion_backends.py [--frames 500] [--scale 4]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.detection.motion_backends import MOTION_BACKENDS, create_motion_backend
+from src.core.frame_grabber import FRAME_SHAPE
+from src.detection.motion_detection import analyse_motion
+
+
+def make_frames(count, shape=FRAME_SHAPE, seed=0):
+    """Noisy static background with a square moving across it."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(60, 120, size=shape, dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        noise = rng.integers(0, 8, size=shape, dtype=np.uint8)
+        cv2.add(frame, noise, dst=frame)
+        x = (i * 3) % (shape[1] - 40)
+        cv2.rectangle(frame, (x, 100), (x + 40, 140), (230, 230, 230), -1)
+        frames.append(frame)
+    return frames
+
+
+def benchmark(name, frames, scale, threshold=30):
+    size = (FRAME_SHAPE[1] // scale, FRAME_SHAPE[0] // scale)
+    backend = create_motion_backend(name, size, threshold, scale)
+
+    start = time.perf_counter()
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        analyse_motion(backend.apply(small), scale, 200)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(frames) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark motion detection backends")
+    parser.add_argument("--frames", type=int, default=500, help="Number of synthetic frames")
+    parser.add_argument("--scale", type=int, default=4, help="Analysis downscale factor")
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    print(f"📊 Motion backends: {args.frames} frames of {FRAME_SHAPE[1]}x{FRAME_SHAPE[0]}")
+    print("-" * 50)
+    print(f"{'backend':<20}{'scale':>8}{'ms/frame':>12}")
+
+    # Full-resolution MOG2 is the pre-downscaling baseline
+    rows = [("mog2", 1)] + [(name, args.scale) for name in MOTION_BACKENDS]
+    for name, scale in rows:
+        cost = benchmark(name, frames, scale)
+        print(f"{name:<20}{scale:>8}{cost:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,12 @@ Initialize Face Encodings
 Create an initial encodings.pickle file for the face recognition system
 """
 
-import pickle
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils.gallery_meta import gallery_meta, save_encodings
 
 def create_initial_encodings():
     """Create an empty encodings.pickle file if it doesn't exist"""
@@ -26,8 +30,7 @@ def create_initial_encodings():
             "names": []
         }
         
-        with open(encodings_file, "wb") as f:
-            pickle.dump(initial_data, f)
+        save_encodings(encodings_file, initial_data)
         
         print(f"✅ Created empty encodings file")
         print("📝 To add faces:")
@@ -37,15 +40,10 @@ def create_initial_encodings():
     else:
         print(f"✅ Encodings file already exists: {encodings_file}")
         
-        # Show current status
-        with open(encodings_file, "rb") as f:
-            data = pickle.load(f)
-        
-        num_faces = len(data.get("encodings", []))
-        names = data.get("names", [])
-        print(f"📊 Current encodings: {num_faces} faces")
-        if names:
-            print(f"🏷️  Known people: {', '.join(set(names))}")
+        # Show current status (also writes the metadata sidecar for galleries that predate it)
+        meta = gallery_meta(encodings_file)
+        print(f"📊 Current encodings: {meta['count']} faces, {meta['identities']} people "
+              f"(version {meta['version']}, updated {meta['updated']})")
 
 if __name__ == "__main__":
     create_initial_encodings()
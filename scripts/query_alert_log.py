@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Alert Log Query Tool
+====================
+Reads the JSON-lines alert log (including gzipped archives) and prints the
+alerts matching a camera, type and time range.
+
+Usage:
+    python scripts/query_alert_log.py [--camera 0] [--type object]
+                                      [--since "2024-05-01 08:00"] [--until "2024-05-01 18:00"]
+                                      [--json] [--dir data/alerts]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.alert_log import ALERT_LOG_DIR, read_alert_log
+
+
+def parse_time(value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a date/time like 2024-05-01 or '2024-05-01 08:00', got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the structured alert log")
+    parser.add_argument("--dir", default=ALERT_LOG_DIR, help="alert log directory")
+    parser.add_argument("--camera", type=int, help="camera id")
+    parser.add_argument("--type", choices=["face", "motion", "object"], help="alert type")
+    parser.add_argument("--since", type=parse_time, help="start of the time range")
+    parser.add_argument("--until", type=parse_time, help="end of the time range")
+    parser.add_argument("--json", action="store_true", help="print raw JSON lines")
+    args = parser.parse_args()
+
+    count = 0
+    for record in read_alert_log(args.dir, args.camera, args.type, args.since, args.until):
+        count += 1
+        if args.json:
+            print(json.dumps(record))
+        else:
+            print(f"{record['ts']}  cam{record.get('cam_id')}  {record.get('type', ''):<6}  "
+                  f"{record.get('severity', ''):<6}  {record.get('message', '')}")
+    print(f"{count} alerts", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
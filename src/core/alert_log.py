@@ -0,0 +1,156 @@
+import glob
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+# 🔹 Alert log settings
+ALERT_LOG_DIR = os.path.join("data", "alerts")
+ALERT_LOG_NAME = "alerts.jsonl"
+ALERT_LOG_MAX_MB = int(os.getenv("ALERT_LOG_MAX_MB", 50))
+ALERT_LOG_FSYNC_SECONDS = float(os.getenv("ALERT_LOG_FSYNC_SECONDS", 5))
+ALERT_LOG_KEEP_ARCHIVES = int(os.getenv("ALERT_LOG_KEEP_ARCHIVES", 90))
+BUFFER_SIZE = 64 * 1024
+
+
+def compress_file(path):
+    """Replaces ``path`` with ``path.gz``."""
+    try:
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except OSError as e:
+        print(f"[ERROR] Failed to compress alert log {path}: {e}")
+
+
+class AlertLogWriter:
+    """
+    Appends alerts as JSON lines to ``alerts.jsonl``.
+
+    The file stays open with a large write buffer; it is flushed and fsynced
+    at most every ``fsync_seconds`` rather than once per alert. The log rolls
+    over when the day changes or it reaches ``max_bytes``; the closed file is
+    renamed to ``alerts_<YYYYMMDD>_<HHMMSS>.jsonl`` and gzipped in the
+    background, and only the newest ``keep_archives`` archives are kept.
+    """
+
+    def __init__(self, log_dir=ALERT_LOG_DIR, max_bytes=ALERT_LOG_MAX_MB * 1024 * 1024,
+                 fsync_seconds=ALERT_LOG_FSYNC_SECONDS, keep_archives=ALERT_LOG_KEEP_ARCHIVES):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, ALERT_LOG_NAME)
+        self.max_bytes = max_bytes
+        self.fsync_seconds = fsync_seconds
+        self.keep_archives = keep_archives
+        self.file = None
+        self.day = None
+        self.size = 0
+        self.dirty = False
+        self.last_sync = time.time()
+        os.makedirs(log_dir, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8", buffering=BUFFER_SIZE)
+        self.size = os.path.getsize(self.path)
+        # An existing log keeps the day it was last written on, so a restart after midnight still rolls it over
+        if self.size:
+            self.day = datetime.fromtimestamp(os.path.getmtime(self.path)).date()
+        else:
+            self.day = datetime.now().date()
+
+    def write(self, record):
+        """Buffers one alert record; ``ts`` is filled in when missing."""
+        now = datetime.now()
+        if now.date() != self.day or self.size >= self.max_bytes:
+            self.rotate()
+        record.setdefault("ts", now.isoformat(timespec="milliseconds"))
+        # ensure_ascii keeps the character count equal to the byte count
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        self.file.write(line)
+        self.size += len(line)
+        self.dirty = True
+
+    def sync(self):
+        if self.dirty:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.dirty = False
+        self.last_sync = time.time()
+
+    def sync_if_due(self):
+        if self.dirty and time.time() - self.last_sync >= self.fsync_seconds:
+            self.sync()
+
+    def rotate(self):
+        self.sync()
+        self.file.close()
+        if os.path.getsize(self.path):
+            stem = os.path.join(self.log_dir, f"alerts_{self.day.strftime('%Y%m%d')}_{datetime.now().strftime('%H%M%S')}")
+            archive, n = f"{stem}.jsonl", 0
+            while os.path.exists(archive) or os.path.exists(archive + ".gz"):
+                n += 1
+                archive = f"{stem}_{n}.jsonl"
+            os.replace(self.path, archive)
+            threading.Thread(target=compress_file, args=(archive,), daemon=True).start()
+            self._prune()
+        self._open()
+
+    def _prune(self):
+        archives = sorted(glob.glob(os.path.join(self.log_dir, "alerts_*.jsonl.gz")))
+        for old in archives[:max(0, len(archives) - self.keep_archives)]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def close(self):
+        if self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+
+def iter_log_files(log_dir=ALERT_LOG_DIR):
+    """Archives in date order, followed by the live log."""
+    plain = glob.glob(os.path.join(log_dir, "alerts_*.jsonl"))
+    # An archive still being compressed is read from its plain copy
+    compressed = [path for path in glob.glob(os.path.join(log_dir, "alerts_*.jsonl.gz")) if path[:-3] not in plain]
+    files = sorted(plain + compressed)
+    live = os.path.join(log_dir, ALERT_LOG_NAME)
+    if os.path.exists(live):
+        files.append(live)
+    return files
+
+
+def read_alert_log(log_dir=ALERT_LOG_DIR, cam_id=None, alert_type=None, since=None, until=None):
+    """
+    Yields logged alert records matching the filters.
+
+    ``since`` and ``until`` are datetimes; archives whose day falls entirely
+    outside the range are skipped without being opened.
+    """
+    for path in iter_log_files(log_dir):
+        name = os.path.basename(path)
+        if name.startswith("alerts_"):
+            day = datetime.strptime(name[7:15], "%Y%m%d").date()
+            if (since and day < since.date()) or (until and day > until.date()):
+                continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                if cam_id is not None and record.get("cam_id") != cam_id:
+                    continue
+                if alert_type and record.get("type") != alert_type:
+                    continue
+                if since or until:
+                    ts = datetime.fromisoformat(record["ts"])
+                    if (since and ts < since) or (until and ts > until):
+                        continue
+                yield record
@@ -1,32 +1,22 @@
-import smtplib
-import cv2
-import numpy as np
 import os
-import time
-import sqlite3
-import json
-from datetime import datetime
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from queue import Empty
 import plyer
-from ..web.app import Alert, db, CameraSetting  
-from flask import current_app  
+from ..web.app import Alert, db, CameraSetting
+from flask import current_app
+from .notifier import RecipientCache, ring
+from .outbox import release_for_alert
+from .frame_grabber import SharedFrameGrabber
+from .snapshot_writer import get_snapshot_writer
 
-ALERT_INTERVAL = 60
-last_alert_time = {
-    "motion": {},
-    "object": {},
-    "face": {}
-}
+# Severities whose email and desktop notification go out when the incident opens, not when it closes
+ALERT_NOTIFY_ON_OPEN = {s.strip() for s in os.getenv("ALERT_NOTIFY_ON_OPEN", "high").split(",") if s.strip()}
 
 
 def load_camera_settings():
     """Loads camera settings from database."""
     try:
         with current_app.app_context():
-            settings = CameraSetting.query.all()
+            settings = CameraSetting.query.order_by(CameraSetting.id).all()
             if settings:
                 setts = [setting.to_dict() for setting in settings]
                 print(setts)
@@ -39,123 +29,24 @@ def load_camera_settings():
         # Return default settings on error
         return []
 
-# 🔹 Capture Frame Function
-def capture_frame(cam_id):
-    cap = cv2.VideoCapture(cam_id, cv2.CAP_DSHOW)
-    time.sleep(2)
+def cameras_by_slot(camera_settings):
+    """
+    Maps the cam_id that workers report to that camera's settings.
 
-    if not cap.isOpened():
-        print(f"[ERROR] Could not access camera {cam_id}")
-        return None
+    main() gives every camera a shared-memory slot and workers report it as
+    their cam_id; settings loaded without main() fall back to list position.
+    """
+    return {cam_config.get("slot", index): cam_config for index, cam_config in enumerate(camera_settings)}
 
-    ret, frame = cap.read()
-    cap.release()
+# 🔹 Capture Frame Function
+frame_grabber = SharedFrameGrabber()
 
-    if ret and frame is not None:
-        image_path = f"alert_frame_cam{cam_id}.jpg"
-        cv2.imwrite(image_path, frame)
-        if os.path.exists(image_path) and os.path.getsize(image_path) > 0:
-            print(f"[INFO] Frame captured successfully: {image_path}")
-            return image_path
-        else:
-            print("[ERROR] Captured image is empty or corrupted.")
-            return None
-    else:
-        print("[ERROR] Failed to capture frame.")
+def capture_frame(cam_id):
+    """Saves the camera's current shared-memory frame through the snapshot writer and returns its path."""
+    frame = frame_grabber.grab(cam_id)
+    if frame is None:
         return None
-
-# 🔹 Send Email with Attachment
-def send_email_notification(subject, message, attachment_path=None):
-    # Load email configuration from environment variables
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    sender_email = os.getenv('MAIL_USERNAME')
-    password = os.getenv('MAIL_PASSWORD')
-    
-    # Check if email notifications are enabled
-    email_enabled = os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true'
-    
-    if not email_enabled:
-        print("[INFO] Email notifications are disabled.")
-        return
-    
-    if not all([sender_email, password]):
-        print("[ERROR] Email credentials not configured. Check your .env file.")
-        return
-
-    # Get all active users with email addresses from database
-    from ..web.app import User, db, app
-    try:
-        with app.app_context():
-            users_with_emails = User.query.filter(
-                User.email.isnot(None),
-                User.email != '',
-                User.is_active == True
-            ).all()
-            
-            if not users_with_emails:
-                print("[WARNING] No active users with email addresses found. Sending to admin only.")
-                # Fallback to admin email
-                admin_email = os.getenv('ADMIN_EMAIL', sender_email)
-                recipient_emails = [admin_email]
-            else:
-                recipient_emails = [user.email for user in users_with_emails]
-                print(f"[INFO] Sending alerts to {len(recipient_emails)} users: {', '.join(recipient_emails)}")
-            
-    except Exception as e:
-        print(f"[ERROR] Failed to get users from database: {e}")
-        # Fallback to admin email
-        admin_email = os.getenv('ADMIN_EMAIL', sender_email)
-        recipient_emails = [admin_email]
-
-    # Send email to each recipient
-    for recipient_email in recipient_emails:
-        try:
-            msg = MIMEMultipart()
-            msg['From'] = sender_email
-            msg['To'] = recipient_email
-            msg['Subject'] = subject
-            
-            # Enhanced message with recipient info
-            enhanced_message = f"""
-IVSS Security Alert
-
-Dear User,
-
-{message}
-
-Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-
-This is an automated security alert from your IVSS Surveillance System.
-
----
-IVSS Security Team
-            """
-            
-            msg.attach(MIMEText(enhanced_message, 'plain'))
-
-            # Attach image if provided
-            if attachment_path and os.path.exists(attachment_path) and os.path.getsize(attachment_path) > 0:
-                with open(attachment_path, "rb") as attachment:
-                    part = MIMEBase("application", "octet-stream")
-                    part.set_payload(attachment.read())
-                    encoders.encode_base64(part)
-                    part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(attachment_path)}")
-                    msg.attach(part)
-
-            # Send email to this recipient
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(sender_email, password)
-            server.sendmail(sender_email, recipient_email, msg.as_string())
-            server.quit()
-            print(f"[INFO] Email sent successfully to: {recipient_email}")
-            
-        except Exception as e:
-            print(f"[ERROR] Failed to send email to {recipient_email}: {e}")
-
-    print(f"[INFO] Email notification process completed for {len(recipient_emails)} recipients")
+    return get_snapshot_writer().submit(cam_id, "alert", frame=frame).path
 
 # 🔹 Send Local Notification
 def send_local_notification(title, message):
@@ -167,141 +58,217 @@ def send_local_notification(title, message):
     )
 
 
-def store_alert(camera, location, message, severity):
-    alert_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_alert = Alert(
-        camera=camera,
-        location=location,
-        time=alert_time,
-        message=message,
-        severity=severity,
-        status='New',  # Default status
-        is_true_detection=None  # Will be reviewed later
-    )
-    db.session.add(new_alert)
-    db.session.commit()
-    print(f"[INFO] Alert stored: {camera}, {location}, {alert_time}, {message}, {severity}")
+def close_alert(alert_id, message, image_path=None):
+    """
+    Replaces an alert's message (and image) with the summary of its closed incident.
 
-# 🔹 Check Alert Interval (per alert type)
-def can_trigger_alert(alert_type, cam_id):
-    global last_alert_time
-    current_time = time.time()
+    The alert's notification was queued with the alert itself; it gets the
+    same summary and, if it was held for it, is released to the dispatcher.
 
-    last_time = last_alert_time[alert_type].get(cam_id, 0)
-    if current_time - last_time >= ALERT_INTERVAL:
-        last_alert_time[alert_type][cam_id] = current_time
-        return True
-    else:
-        print(f"[DEBUG] Skipping {alert_type} alert for Camera {cam_id} due to time restriction.")
-        return False
+    Returns:
+        int: the number of notifications released.
+    """
+    try:
+        alert = db.session.get(Alert, alert_id)
+        if alert is None:
+            return 0
+        alert.message = message[:200]
+        if image_path:
+            alert.image_path = image_path
+        released = release_for_alert(alert_id, message, image_path)
+        db.session.commit()
+        return released
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Failed to update alert {alert_id}: {e}")
+        return 0
 
-# 🔹 Main Alert Processing Function
-import time
-from collections import defaultdict
 
-import time
-from collections import defaultdict
-from queue import Empty
+def attach_clips(clip_results):
+    """Stores the paths of finished clips on their alerts."""
+    while True:
+        try:
+            alert_ids, clip_path = clip_results.get_nowait()
+        except Empty:
+            break
+        try:
+            Alert.query.filter(Alert.id.in_(alert_ids)).update({Alert.clip_path: clip_path}, synchronize_session=False)
+            db.session.commit()
+            print(f"[INFO] Clip {clip_path} attached to alerts {alert_ids}")
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Failed to attach clip {clip_path}: {e}")
+
+# 🔹 Main Alert Processing Function
+from .event_bus import EventBus
+from .alert_aggregator import AlertAggregator
+from .alert_store import AlertStore
+from .alert_log import AlertLogWriter
 from ..web.app import app  # or whatever your Flask file is named
 
-def alert_process(object_queue, face_queue, motion_queue):
+def alert_process(event_queue, clip_queues=None, clip_results=None, notify_queue=None, config_channel=None):
+    if clip_queues is None:
+        clip_queues = {}
     with app.app_context():
-        camera_settings = load_camera_settings()
+        # Follow live settings changes when main() shares them, otherwise read them once
+        config = config_channel.reader() if config_channel is not None else None
+        camera_settings = list(config.current) if config is not None else load_camera_settings()
         print(camera_settings)
-        log_file_path = os.path.join("data", "alerts", "alerts_log.txt")
-
-        last_alert_times = defaultdict(lambda: 0)
-        alert_interval = 10  # seconds
-
-        def log_to_file(alert_type, cam_id, message, severity, image_path):
-            # Ensure the log directory exists
-            os.makedirs(os.path.dirname(log_file_path), exist_ok=True)
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            log_line = f"[{timestamp}] {alert_type.upper()} ALERT - Camera: {cam_id} | Severity: {severity} | Message: {message} | Image: {image_path}\n"
-            with open(log_file_path, "a", encoding="utf-8") as f:
-                f.write(log_line)
-
-        while True:
-            now = time.time()
-            # 🔥 Face Recognition Alerts
-
-            try:
-                alert = face_queue.get_nowait()
-                alert = alert[0]  # Assuming alert is a list-like with one item
-                cam_id = alert.get("cam_id")
-                name = alert.get("label") or alert.get("name", "Unknown face")
-
-                if isinstance(cam_id, int) and 0 <= cam_id < len(camera_settings):
-                    if "face" in camera_settings[cam_id].get("detections", []):
-                        key = ("face", cam_id)
-                        if now - last_alert_times[key] >= alert_interval:
-                            image_path = alert.get("image_path") or alert.get("image") or capture_frame(cam_id)
-                            message = f"Face detected: {name}"
-                            severity = alert.get("severity", "high")
-                            log_to_file("face", cam_id, message, severity, image_path)
-                            store_alert(f"Camera {cam_id}", "Face Recognition", message, severity)
-                            send_email_notification("Face Detected", message, image_path)
-                            send_local_notification("Face Detected", message)
-                            last_alert_times[key] = now
-
-                            # ✅ Flush the rest of the queue
-                            while True:
-                                try:
-                                    face_queue.get_nowait()
-                                except Empty:
-                                    break
-            except Empty:
-                pass
-
-            # # 🔥 Motion Detection Alerts
-            try:
-
-                alert = motion_queue.get_nowait()
-                cam_id = alert.get("cam_id")
-                if isinstance(cam_id, int) and 0 <= cam_id < len(camera_settings):
-                    if "motion" in camera_settings[cam_id].get("detections", []):
-                        key = ("motion", cam_id)
-                        if now - last_alert_times[key] >= alert_interval:
-                            image_path = alert.get("image_path") or alert.get("image") or capture_frame(cam_id)
-                            message = alert.get("message", "Motion detected")
-                            severity = alert.get("severity", "medium")
-                            log_to_file("motion", cam_id, message, severity, image_path)
-                            store_alert(f"Camera {cam_id}", "Motion Detection", message, severity)
-                            send_local_notification("Motion Detected", message)
-                            send_email_notification("Motion Detected", message, image_path)
-                            last_alert_times[key] = now
-            except Empty:
-                pass
-
-            # 🔥 Object Detection Alerts
-            try:
-                alert = object_queue.get_nowait()
-                cam_id = alert.get("cam_id")
-                if isinstance(cam_id, int) and 0 <= cam_id < len(camera_settings):
-                    if "object" in camera_settings[cam_id].get("detections", []):
-                        label = alert.get("detections")[0]["label"]
-                        key = ("object", cam_id)
-                        print(alert)
-                        if now - last_alert_times[key] >= alert_interval:
-                            # image_path = alert.get("image") or capture_frame(cam_id)
-                            message = f"Object detected: {label}"
-                            severity = alert.get("severity", "high")
-                            log_to_file("object", cam_id, message, severity, "image_path")
-                            store_alert(f"Camera {cam_id}", "Object Detection", message, severity)
-                            send_email_notification("Object Detected", message, "image_path")
-                            send_local_notification("Object Detected", message)
-                            last_alert_times[key] = now
-                                                    # ✅ Flush the rest of the queue
-                            while True:
-                                try:
-                                    object_queue.get_nowait()
-                                except Empty:
-                                    break
-            except Empty:
-                pass
-
-
-
-            time.sleep(0.05)
-
-
+        cameras = cameras_by_slot(camera_settings)
+        aggregator = AlertAggregator()
+        alert_store = AlertStore()
+        alert_log = AlertLogWriter()
+        email_enabled = os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true'
+        recipient_cache = RecipientCache()
+
+        # Location and notification title per alert type
+        alert_kinds = {
+            "face": ("Face Recognition", "Face Detected"),
+            "motion": ("Motion Detection", "Motion Detected"),
+            "object": ("Object Detection", "Object Detected"),
+        }
+
+        def request_clip(cam_id, alert_id):
+            clip_queue = clip_queues.get(cam_id)
+            if clip_queue is not None and alert_id is not None:
+                clip_queue.put(alert_id)
+
+        def is_enabled(detection_type, cam_id):
+            cam_config = cameras.get(cam_id)
+            if cam_config is None:
+                return False
+            return detection_type in cam_config.get("detections", [])
+
+        def record(cam_id, alert_type, label, message, severity, image_path, confidence=None, now=None,
+                   activity=None):
+            """Adds a sighting; the first one of an incident is stored right away so its clip has the right pre-roll."""
+            incident = aggregator.add(cam_id, alert_type, label, message, severity, image_path, confidence, now,
+                                      activity=activity)
+            if incident is not None:
+                location, title = alert_kinds[alert_type]
+                incident.image_path = incident.image_path or capture_frame(cam_id)
+                notify_now = severity in ALERT_NOTIFY_ON_OPEN
+                # Queued with the alert: sent at once for urgent severities, otherwise held until the
+                # incident closes with its summary. Severities nobody wants at once are left to the digest process
+                notification = None
+                if email_enabled and recipient_cache.get(severity):
+                    notification = {"subject": title, "status": "pending" if notify_now else "held"}
+
+                def on_stored(alert_id):
+                    incident.alert_id = alert_id
+                    request_clip(cam_id, alert_id)
+                    # Released before it was written (the incident closed while the store was backing off)
+                    if notification is not None and notification["status"] == "pending":
+                        ring(notify_queue)
+
+                incident.pending_alert = alert_store.add(f"Camera {cam_id}", location, message, severity,
+                                                         incident.image_path, on_stored,
+                                                         camera_id=cameras[cam_id].get("id"),
+                                                         notification=notification)
+                alert_log.write({
+                    "event": "opened",
+                    "type": alert_type,
+                    "cam_id": cam_id,
+                    "label": label,
+                    "severity": severity,
+                    "message": message,
+                    "first_seen": incident.first_seen,
+                    "image": incident.image_path,
+                })
+                if notify_now:
+                    send_local_notification(title, message)
+
+        def close_incident(incident):
+            """Puts the incident's summary on its alert and on any notification not yet sent."""
+            _, title = alert_kinds[incident.alert_type]
+            message = incident.summary()
+            if incident.alert_id is not None:
+                if close_alert(incident.alert_id, message, incident.image_path):
+                    ring(notify_queue)
+            elif incident.pending_alert is not None and incident.pending_alert.pending:
+                # Still waiting to be written (the store is backing off after a failed commit): store the summary instead
+                pending_alert = incident.pending_alert
+                pending_alert.fields["message"] = message[:200]
+                if incident.image_path:
+                    pending_alert.fields["image_path"] = incident.image_path
+                if pending_alert.notification:
+                    pending_alert.notification["status"] = "pending"
+            alert_log.write({
+                "event": "closed",
+                "alert_id": incident.alert_id,
+                "type": incident.alert_type,
+                "cam_id": incident.cam_id,
+                "label": incident.label,
+                "severity": incident.severity,
+                "message": message,
+                "count": incident.count,
+                "first_seen": incident.first_seen,
+                "last_seen": incident.last_seen,
+                "max_confidence": incident.max_confidence,
+                "max_activity": incident.max_activity,
+                "image": incident.image_path,
+            })
+            if incident.severity not in ALERT_NOTIFY_ON_OPEN:
+                send_local_notification(title, message)
+
+        # 🔥 Face Recognition Alerts
+        def handle_face(event):
+            cam_id = event["cam_id"]
+            if not is_enabled("face", cam_id):
+                return
+            for face in event["data"]:
+                name = face.get("label") or face.get("name", "Unknown face")
+                record(cam_id, "face", name, f"Face detected: {name}", face.get("severity", "high"),
+                       face.get("image_path") or face.get("image"), now=event["ts"])
+
+        # 🔥 Motion Detection Alerts
+        def handle_motion(event):
+            cam_id = event["cam_id"]
+            if not is_enabled("motion", cam_id):
+                return
+            alert = event["data"]
+            zones = [name for name, score in (alert.get("zones") or {}).items() if score > 0]
+            record(cam_id, "motion", zones[0] if zones else None, alert.get("message", "Motion detected"),
+                   alert.get("severity", "medium"), alert.get("image_path") or alert.get("image"),
+                   activity=alert.get("activity"), now=event["ts"])
+
+        # 🔥 Object Detection Alerts
+        def handle_object(event):
+            cam_id = event["cam_id"]
+            if not is_enabled("object", cam_id):
+                return
+            alert = event["data"]
+            for detection in alert.get("detections", []):
+                label = detection["label"]
+                record(cam_id, "object", label, f"Object detected: {label}", alert.get("severity", "high"),
+                       alert.get("image_path") or alert.get("image"), confidence=detection.get("confidence"),
+                       now=event["ts"])
+
+        def on_wakeup():
+            changed = config.poll() if config is not None else None
+            if changed is not None:
+                new_cameras = cameras_by_slot(changed)
+                # A slot that now belongs to another camera (or none) has a new shared memory block
+                for slot in set(cameras) | set(new_cameras):
+                    if cameras.get(slot, {}).get("id") != new_cameras.get(slot, {}).get("id"):
+                        frame_grabber.release(slot)
+                cameras.clear()
+                cameras.update(new_cameras)
+                print(f"[INFO] Alert process picked up new settings for {len(changed)} cameras")
+            alert_store.flush_if_due()
+            closed = aggregator.expire()
+            if closed and len(alert_store):
+                # Closing incidents need their alert ids
+                alert_store.flush()
+            for incident in closed:
+                close_incident(incident)
+            if clip_results is not None:
+                attach_clips(clip_results)
+            alert_log.sync_if_due()
+
+        bus = EventBus(event_queue)
+        bus.register("face", handle_face)
+        bus.register("motion", handle_motion)
+        bus.register("object", handle_object)
+        # Wake up at least as often as the alert store's flush interval
+        bus.run_forever(on_wakeup, timeout=alert_store.max_delay)
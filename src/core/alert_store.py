@@ -0,0 +1,157 @@
+import os
+import time
+from datetime import datetime
+
+from ..web.app import Alert, db, add_to_rollups
+from .outbox import add_to_outbox
+
+# 🔹 Group-commit settings
+ALERT_BATCH_ROWS = int(os.getenv("ALERT_BATCH_ROWS", 50))
+ALERT_BATCH_MS = int(os.getenv("ALERT_BATCH_MS", 200))
+# A batch whose commit fails is retried with exponential backoff before its alerts are given up
+ALERT_BATCH_MAX_ATTEMPTS = int(os.getenv("ALERT_BATCH_MAX_ATTEMPTS", 8))
+ALERT_BATCH_RETRY_MAX_SECONDS = float(os.getenv("ALERT_BATCH_RETRY_MAX_SECONDS", 30))
+
+
+class PendingAlert:
+    """
+    An alert waiting in the store; ``fields`` and ``notification`` can still
+    be changed until it is written.
+    """
+
+    __slots__ = ("fields", "notification", "on_stored", "attempts", "alert_id", "dropped")
+
+    def __init__(self, fields, notification, on_stored):
+        self.fields = fields
+        self.notification = notification
+        self.on_stored = on_stored
+        self.attempts = 0
+        self.alert_id = None
+        self.dropped = False
+
+    @property
+    def pending(self):
+        return self.alert_id is None and not self.dropped
+
+
+class AlertStore:
+    """
+    Buffers new alerts and writes them in one transaction.
+
+    A batch is flushed once it holds ``max_rows`` alerts or its oldest alert
+    has waited ``max_delay_ms``, whichever comes first. The rows go in with
+    one ``add_all`` and a session flush, which SQLAlchemy turns into a single
+    multi-row INSERT ... RETURNING on PostgreSQL, so every alert still gets
+    its id. An alert's notification goes into the outbox in the same
+    transaction, so neither is ever saved without the other. Callbacks
+    receive the alert id after the commit, for work that needs it (clip
+    requests).
+
+    If the commit fails the batch goes back to the front of the queue and is
+    retried after an exponential backoff; alerts that still fail after
+    ``max_attempts`` are logged in full and dropped.
+    """
+
+    def __init__(self, max_rows=ALERT_BATCH_ROWS, max_delay_ms=ALERT_BATCH_MS,
+                 max_attempts=ALERT_BATCH_MAX_ATTEMPTS, retry_max_seconds=ALERT_BATCH_RETRY_MAX_SECONDS):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000.0
+        self.max_attempts = max_attempts
+        self.retry_max_seconds = retry_max_seconds
+        self.pending = []  # PendingAlert
+        self.oldest = None
+        self.retry_at = 0
+
+    def add(self, camera, location, message, severity, image_path=None, on_stored=None, camera_id=None,
+            notification=None):
+        """
+        Queues one alert; ``on_stored(alert_id)`` runs once it is committed.
+
+        ``notification`` is a dict with the outbox ``subject`` and ``status``
+        (``held`` or ``pending``) of the email that goes with the alert.
+
+        Returns:
+            PendingAlert: the queued entry.
+        """
+        now = datetime.now().replace(microsecond=0)
+        entry = PendingAlert({
+            "camera": camera,
+            "camera_id": camera_id,
+            "location": location,
+            "time": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "created_at": now,
+            "message": message[:200],
+            "severity": severity,
+            "image_path": image_path,
+        }, notification, on_stored)
+        if not self.pending:
+            self.oldest = time.time()
+        self.pending.append(entry)
+        if len(self.pending) >= self.max_rows:
+            self.flush()
+        return entry
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        return bool(self.pending) and now - self.oldest >= self.max_delay and now >= self.retry_at
+
+    def flush_if_due(self, now=None):
+        if self.due(now):
+            self.flush()
+
+    def flush(self):
+        """Writes every pending alert in one transaction and then runs their callbacks."""
+        if not self.pending or time.time() < self.retry_at:
+            return 0
+        batch, self.pending = self.pending, []
+        # Rows are built afresh on every attempt, since a rollback leaves the old ones detached
+        alerts = [Alert(status='New', is_true_detection=None, **entry.fields) for entry in batch]
+        try:
+            db.session.add_all(alerts)
+            db.session.flush()
+            for entry, alert in zip(batch, alerts):
+                if entry.notification:
+                    add_to_outbox(alert.id, entry.notification["subject"], alert.message, alert.image_path,
+                                  severity=alert.severity, status=entry.notification["status"])
+            add_to_rollups(alerts)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self._retry_later(batch, e)
+            return 0
+
+        self.retry_at = 0
+        print(f"[INFO] Stored {len(batch)} alerts (ids {alerts[0].id}-{alerts[-1].id})")
+        for entry, alert in zip(batch, alerts):
+            entry.alert_id = alert.id
+            if entry.on_stored is None:
+                continue
+            try:
+                entry.on_stored(alert.id)
+            except Exception as e:
+                print(f"[ERROR] Callback for alert {alert.id} failed: {e}")
+        return len(batch)
+
+    def _retry_later(self, batch, error):
+        retry, dropped = [], []
+        for entry in batch:
+            entry.attempts += 1
+            (retry if entry.attempts < self.max_attempts else dropped).append(entry)
+
+        for entry in dropped:
+            entry.dropped = True
+            print(f"[ERROR] Dropping alert after {entry.attempts} failed attempts: {entry.fields}")
+        if retry:
+            attempts = max(entry.attempts for entry in retry)
+            delay = min(self.retry_max_seconds, 2 ** attempts)
+            self.retry_at = time.time() + delay
+            print(f"[ERROR] Failed to store {len(batch)} alerts ({error}); retrying {len(retry)} in {delay:.1f} s")
+        else:
+            self.retry_at = 0
+            print(f"[ERROR] Failed to store {len(batch)} alerts: {error}")
+
+        # Older alerts go first, ahead of anything added since
+        self.pending = retry + self.pending
+
+    def __len__(self):
+        return len(self.pending)
@@ -0,0 +1,139 @@
+import os
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from queue import Empty
+
+import numpy as np
+
+from .segment_recorder import video_writer_class
+
+CLIP_DIR = os.path.join("data", "clips")
+CLIP_FPS = int(os.getenv("CLIP_FPS", 10))
+CLIP_PRE_SECONDS = float(os.getenv("CLIP_PRE_SECONDS", 5))
+CLIP_POST_SECONDS = float(os.getenv("CLIP_POST_SECONDS", 10))
+
+
+def clip_path(cam_id, started_at, output_dir=CLIP_DIR):
+    local = time.localtime(started_at)
+    return os.path.join(output_dir, time.strftime("%Y%m%d", local), f"cam{cam_id}",
+                        f"clip_cam{cam_id}_{time.strftime('%Y%m%d_%H%M%S', local)}.mp4")
+
+
+class ClipWriter:
+    """
+    An MP4 clip written frame by frame under a temporary name until ``finish``.
+
+    Clips are played inline in the alerts page, so they are encoded as H.264
+    through the same ffmpeg pipe as continuous recordings when ffmpeg is
+    installed, and fall back to OpenCV's mp4v otherwise.
+    """
+
+    def __init__(self, cam_id, started_at, fps, shape, output_dir=CLIP_DIR):
+        self.path = clip_path(cam_id, started_at, output_dir)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.tmp_path = f"{self.path[:-4]}.tmp.mp4"
+        height, width = shape[:2]
+        self.frames = 0
+        try:
+            self.writer = video_writer_class()(self.tmp_path, (width, height), fps)
+        except OSError as e:
+            print(f"[ERROR] Could not start video writer for {self.path}: {e}")
+            self.writer = None
+        if self.writer is not None and not self.writer.is_open():
+            print(f"[ERROR] Could not open video writer for {self.path}")
+            self.writer = None
+
+    def write(self, frame):
+        if self.writer is None:
+            return
+        try:
+            self.writer.write(frame)
+            self.frames += 1
+        except OSError as e:
+            print(f"[ERROR] Encoder for {self.path} stopped: {e}")
+            self.writer.release()
+            self.writer = None
+
+    def finish(self):
+        """Closes the file and returns its final path, or None if nothing was written."""
+        if self.writer is None:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+            return None
+        ok = self.writer.release()
+        if not ok or not self.frames:
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+            return None
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+def clip_recorder_process(shm_name, shape, cam_id, request_queue, result_queue,
+                          fps=CLIP_FPS, pre_seconds=CLIP_PRE_SECONDS, post_seconds=CLIP_POST_SECONDS):
+    """
+    Samples a camera's shared memory into an in-memory pre-roll ring.
+
+    Each alert id received on ``request_queue`` starts a clip: the ring
+    contents are encoded straight away and the next ``post_seconds`` of frames
+    are encoded as they are sampled, so frames never leave this process.
+    Alerts arriving while a clip is still collecting its post-roll are
+    attached to that clip. ``(alert_ids, path)`` is reported on
+    ``result_queue`` once the clip is complete.
+    """
+    shared_mem = shared_memory.SharedMemory(name=shm_name)
+    frame_buffer = np.ndarray(shape, dtype=np.uint8, buffer=shared_mem.buf)
+
+    ring = deque(maxlen=max(1, int(fps * pre_seconds)))
+    interval = 1.0 / fps
+    clip = None
+
+    print(f"[INFO] Clip recorder started for Camera {cam_id} ({pre_seconds}s pre-roll, {post_seconds}s post-roll)")
+
+    try:
+        next_tick = time.time()
+        while True:
+            now = time.time()
+            frame = frame_buffer.copy()
+
+            if clip is None:
+                ring.append(frame)
+            else:
+                clip["writer"].write(frame)
+
+            while True:
+                try:
+                    alert_id = request_queue.get_nowait()
+                except Empty:
+                    break
+                if clip is None:
+                    writer = ClipWriter(cam_id, now - len(ring) * interval, fps, shape)
+                    for pre_frame in ring:
+                        writer.write(pre_frame)
+                    ring.clear()
+                    clip = {"alert_ids": [alert_id], "writer": writer, "ends_at": now + post_seconds}
+                else:
+                    clip["alert_ids"].append(alert_id)
+
+            if clip is not None and now >= clip["ends_at"]:
+                try:
+                    path = clip["writer"].finish()
+                except Exception as e:
+                    print(f"[ERROR] Failed to finish clip for Camera {cam_id}: {e}")
+                    path = None
+                if path:
+                    print(f"[INFO] Clip saved: {path} ({clip['writer'].frames} frames)")
+                    result_queue.put((clip["alert_ids"], path))
+                clip = None
+
+            next_tick += interval
+            delay = next_tick - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.time()
+    finally:
+        if clip is not None:
+            clip["writer"].finish()
+        shared_mem.close()
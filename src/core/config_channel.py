@@ -0,0 +1,66 @@
+import multiprocessing as mp
+
+
+class ConfigChannel:
+    """
+    Camera settings shared with running workers.
+
+    The settings live in a Manager dict keyed by CameraSetting id, so a
+    camera keeps its entry when others are added or removed; a version
+    counter in shared memory is bumped after every change. Workers read the
+    counter on each loop, which costs no IPC, and only fetch their camera's
+    settings when it has moved.
+    """
+
+    def __init__(self, manager):
+        self.configs = manager.dict()
+        self.version = mp.Value('i', 0)
+
+    def publish(self, camera_settings):
+        """Replaces the shared settings with ``camera_settings`` (a list of CameraSetting dicts)."""
+        keys = set()
+        for config in camera_settings:
+            keys.add(config["id"])
+            if self.configs.get(config["id"]) != config:
+                self.configs[config["id"]] = config
+        for key in list(self.configs.keys()):
+            if key not in keys:
+                del self.configs[key]
+        with self.version.get_lock():
+            self.version.value += 1
+
+    def reader(self, camera_key=None):
+        return ConfigReader(self, camera_key)
+
+
+class ConfigReader:
+    """A worker's view of the channel, remembering the last version and settings it applied."""
+
+    def __init__(self, channel, camera_key=None):
+        self.channel = channel
+        self.camera_key = camera_key
+        self.seen = channel.version.value
+        self.current = self._read()
+
+    def _read(self):
+        if self.camera_key is None:
+            configs = dict(self.channel.configs)
+            return [configs[key] for key in sorted(configs)]
+        return self.channel.configs.get(self.camera_key)
+
+    def poll(self):
+        """
+        Returns the new settings if they changed since the last call, otherwise None.
+
+        Without a ``camera_key`` (a CameraSetting id) the reader follows the
+        whole camera list.
+        """
+        version = self.channel.version.value
+        if version == self.seen:
+            return None
+        self.seen = version
+        config = self._read()
+        if config == self.current:
+            return None
+        self.current = config
+        return config
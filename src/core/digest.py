@@ -0,0 +1,145 @@
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+from ..web.app import Alert, User, app, db, thumbnail_cache, resolve_data_path
+from .outbox import add_to_outbox
+from .notifier import ring
+from .alert_aggregator import MAX_INCIDENT_SECONDS
+
+# 🔹 Digest settings
+DIGEST_CHECK_SECONDS = 60
+DIGEST_MAX_LINES = 50  # Alerts listed one by one; the counts always cover everything
+DIGEST_STRIP_SIZE = 8  # Thumbnails in the attached strip
+DIGEST_STRIP_HEIGHT = 120
+DIGEST_DIR = os.path.join("data", "digests")
+# Alerts younger than this may belong to an incident that is still open and will get a new summary
+DIGEST_SETTLE_SECONDS = MAX_INCIDENT_SECONDS + 30
+
+
+def build_thumbnail_strip(alerts, path):
+    """
+    Joins the cached thumbnails of the most recent alerts into one JPEG strip.
+
+    Returns:
+        str: ``path`` if a strip was written, otherwise None.
+    """
+    tiles = []
+    for alert in alerts:
+        if len(tiles) >= DIGEST_STRIP_SIZE:
+            break
+        if not alert.image_path:
+            continue
+        thumbnail = thumbnail_cache.get(resolve_data_path(alert.image_path))
+        if thumbnail is None:
+            continue
+        tile = cv2.imdecode(np.frombuffer(thumbnail[0], np.uint8), cv2.IMREAD_COLOR)
+        if tile is None:
+            continue
+        width = max(1, round(tile.shape[1] * DIGEST_STRIP_HEIGHT / tile.shape[0]))
+        tiles.append(cv2.resize(tile, (width, DIGEST_STRIP_HEIGHT)))
+
+    if not tiles:
+        return None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if not cv2.imwrite(path, cv2.hconcat(tiles), [cv2.IMWRITE_JPEG_QUALITY, 80]):
+        return None
+    return path
+
+
+def build_digest(alerts, since):
+    """Returns the subject and body of one user's digest."""
+    by_severity = Counter(alert.severity for alert in alerts)
+    by_source = Counter((alert.camera, alert.location) for alert in alerts)
+
+    lines = [f"{len(alerts)} alerts since {since.strftime('%Y-%m-%d %H:%M')} UTC", ""]
+    lines.append("By severity: " + ", ".join(f"{severity}: {count}" for severity, count in by_severity.most_common()))
+    for (camera, location), count in by_source.most_common():
+        lines.append(f"  {camera} - {location}: {count}")
+    lines.append("")
+    for alert in alerts[-DIGEST_MAX_LINES:]:
+        lines.append(f"[{alert.time}] {alert.camera} | {alert.severity} | {alert.message}")
+    if len(alerts) > DIGEST_MAX_LINES:
+        lines.append(f"... and {len(alerts) - DIGEST_MAX_LINES} earlier alerts")
+
+    subject = f"IVSS Digest: {len(alerts)} alerts"
+    return subject, "\n".join(lines)
+
+
+def send_due_digests(now=None):
+    """
+    Queues a digest for every user whose interval has elapsed.
+
+    Each digest covers the alerts after the user's watermark whose severity the
+    user does not get immediately. It stops at the first alert that may still
+    be open (younger than ``DIGEST_SETTLE_SECONDS``), so every alert goes out
+    with its incident summary and later ones wait for the next digest. The
+    outbox row and the new watermark are committed together, so an alert is
+    never digested twice or skipped.
+
+    Returns:
+        int: the number of digests queued.
+    """
+    now = now or datetime.utcnow()
+    # Alert.created_at is local time
+    settled_before = datetime.now() - timedelta(seconds=DIGEST_SETTLE_SECONDS)
+    queued = 0
+    users = User.query.filter(User.email.isnot(None), User.email != '', User.is_active == True).all()
+    for user in users:
+        interval = user.digest_interval()
+        if interval <= 0:
+            continue
+        if user.digest_sent_at and now - user.digest_sent_at < timedelta(minutes=interval):
+            continue
+
+        try:
+            if user.digest_sent_at is None:
+                # First run for this user: start from now rather than digesting the whole history
+                user.digest_watermark = db.session.query(db.func.max(Alert.id)).scalar() or 0
+                user.digest_sent_at = now
+                db.session.commit()
+                continue
+
+            query = Alert.query.filter(Alert.id > user.digest_watermark)
+            first_unsettled = db.session.query(db.func.min(Alert.id)).filter(
+                Alert.id > user.digest_watermark, Alert.created_at > settled_before).scalar()
+            if first_unsettled is not None:
+                query = query.filter(Alert.id < first_unsettled)
+            immediate = user.immediate_severities()
+            if immediate:
+                query = query.filter(Alert.severity.notin_(immediate))
+            alerts = query.order_by(Alert.id).all()
+            last_id = max((alert.id for alert in alerts), default=user.digest_watermark)
+
+            if alerts:
+                subject, body = build_digest(alerts, user.digest_sent_at)
+                strip_path = os.path.join(DIGEST_DIR, f"digest_user{user.id}_{now.strftime('%Y%m%d_%H%M%S')}.jpg")
+                strip = build_thumbnail_strip(list(reversed(alerts)), strip_path)
+                add_to_outbox(None, subject, body, strip, recipient=user.email)
+                queued += 1
+
+            user.digest_watermark = last_id
+            user.digest_sent_at = now
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"[ERROR] Failed to build digest for {user.username}: {e}")
+    return queued
+
+
+# 🔥 Digest Process
+def digest_process(notify_queue=None, check_seconds=DIGEST_CHECK_SECONDS):
+    """Checks once a minute for users whose digest is due and queues them in the outbox."""
+    if os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() != 'true':
+        return
+    with app.app_context():
+        while True:
+            queued = send_due_digests()
+            if queued:
+                print(f"[INFO] Queued {queued} alert digests")
+                ring(notify_queue)
+            time.sleep(check_seconds)
@@ -0,0 +1,84 @@
+import time
+from queue import Empty
+
+BATCH_SIZE = 64
+DEPTH_WARNING = 500  # queued events before the alert side is reported as lagging
+DEPTH_REPORT_INTERVAL = 60  # seconds
+
+
+def publish(event_queue, event_type, cam_id, data):
+    """Puts a typed detector event on the shared event queue."""
+    event_queue.put({"type": event_type, "cam_id": cam_id, "ts": time.time(), "data": data})
+
+
+class EventBus:
+    """
+    Consumer side of the single event queue shared by all detectors.
+
+    ``drain`` blocks until at least one event arrives (or ``timeout`` passes)
+    and then takes up to ``batch_size`` events without blocking. Each event is
+    dispatched to the handler registered for its type.
+    """
+
+    def __init__(self, event_queue, batch_size=BATCH_SIZE, depth_warning=DEPTH_WARNING):
+        self.queue = event_queue
+        self.batch_size = batch_size
+        self.depth_warning = depth_warning
+        self.handlers = {}
+        self.processed = 0
+        self._last_report = time.time()
+
+    def register(self, event_type, handler):
+        self.handlers[event_type] = handler
+
+    def depth(self):
+        """Number of queued events, or -1 where the platform cannot tell (macOS)."""
+        try:
+            return self.queue.qsize()
+        except NotImplementedError:
+            return -1
+
+    def drain(self, timeout=0.5):
+        try:
+            events = [self.queue.get(timeout=timeout)]
+        except Empty:
+            return []
+        while len(events) < self.batch_size:
+            try:
+                events.append(self.queue.get_nowait())
+            except Empty:
+                break
+        return events
+
+    def dispatch(self, events):
+        for event in events:
+            handler = self.handlers.get(event.get("type"))
+            if handler is None:
+                print(f"[WARNING] No handler registered for {event.get('type')} events")
+                continue
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"[ERROR] Failed to handle {event.get('type')} event from Camera {event.get('cam_id')}: {e}")
+        self.processed += len(events)
+
+    def report_depth(self):
+        now = time.time()
+        depth = self.depth()
+        if depth >= self.depth_warning:
+            print(f"[WARNING] Alert event queue is falling behind: {depth} events waiting")
+        elif now - self._last_report >= DEPTH_REPORT_INTERVAL:
+            print(f"[INFO] Alert event queue depth: {depth}, {self.processed} events handled")
+        else:
+            return
+        self._last_report = now
+
+    def run_forever(self, on_wakeup=None, timeout=0.5):
+        """Drains and dispatches events; ``on_wakeup`` runs after every wakeup, even without events."""
+        while True:
+            events = self.drain(timeout)
+            if events:
+                self.dispatch(events)
+            if on_wakeup is not None:
+                on_wakeup()
+            self.report_depth()
@@ -0,0 +1,62 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+FRAME_SHAPE = (240, 320, 3)  # (height, width, channels), as written by video_capture_process
+
+
+class SharedFrameGrabber:
+    """
+    Reads the latest frame of a camera straight from its shared memory block.
+
+    The camera device is owned by ``video_capture_process``, so the alert side
+    never opens it again. Handles are attached once per camera and reused
+    until ``release`` drops them, which the owner calls when a slot is given
+    to another camera and its block is recreated.
+    """
+
+    def __init__(self, shape=FRAME_SHAPE):
+        self.shape = shape
+        self.handles = {}  # cam_id -> (SharedMemory, frame view)
+
+    def _attach(self, cam_id):
+        handle = self.handles.get(cam_id)
+        if handle is None:
+            shm = shared_memory.SharedMemory(name=f"video_frame_shm_{cam_id}")
+            if shm.size < int(np.prod(self.shape)):
+                shm.close()
+                raise ValueError(f"shared memory for camera {cam_id} is smaller than a {self.shape} frame")
+            handle = (shm, np.ndarray(self.shape, dtype=np.uint8, buffer=shm.buf))
+            self.handles[cam_id] = handle
+        return handle[1]
+
+    def grab(self, cam_id):
+        """
+        Returns a copy of the camera's current frame.
+
+        Returns:
+            numpy.ndarray: the frame, or None if the camera has no shared memory
+            yet or has not written a frame (the block is still all zeros).
+        """
+        try:
+            frame = self._attach(cam_id).copy()
+        except (FileNotFoundError, ValueError) as e:
+            print(f"[ERROR] No frame available for Camera {cam_id}: {e}")
+            return None
+        if not frame.any():
+            print(f"[WARNING] Camera {cam_id} has not produced a frame yet")
+            return None
+        return frame
+
+    def release(self, cam_id=None):
+        """Detaches from ``cam_id``'s block, or from every block; the next grab attaches again."""
+        for key in list(self.handles) if cam_id is None else [cam_id]:
+            handle = self.handles.pop(key, None)
+            if handle is None:
+                continue
+            shm = handle[0]
+            # The frame view has to go before the block can be closed
+            del handle
+            shm.close()
+
+    def close(self):
+        self.release()
@@ -11,11 +11,19 @@ from ..detection.motion_detection import motion_detection_process
 from ..detection.object_detection import object_detection_process
 from ..detection.face_recognition_module import face_recognition_process
 from .alert_module import alert_process
+from .notifier import notification_dispatcher_process
+from .digest import digest_process
+from .snapshot_writer import get_snapshot_writer
+from .snapshot_catalogue import snapshot_retention_process
+from .clip_recorder import clip_recorder_process
+from .segment_recorder import segment_recorder_process
+from .config_channel import ConfigChannel
+from .frame_grabber import FRAME_SHAPE
 from flask import current_app
 from ..web.app import db, CameraSetting  # Replace 'your_app' with your actual app module name
 from ..web.app import app  # or whatever your Flask file is named
 
-FRAME_SHAPE = (240, 320, 3)  # (height, width, channels)
+CONFIG_POLL_SECONDS = float(os.getenv('CONFIG_POLL_SECONDS', 2))
 
 def create_shared_memory(name, size):
     try:
@@ -34,7 +42,7 @@ def load_camera_settings():
     """Loads camera settings from database."""
     try:
         with current_app.app_context():
-            settings = CameraSetting.query.all()
+            settings = CameraSetting.query.order_by(CameraSetting.id).all()
             if settings:
                 setts = [setting.to_dict() for setting in settings]
                 return setts
@@ -47,72 +55,245 @@ def load_camera_settings():
         return []
     
 def save_detection_image(frame, cam_id, detection_type, label=None):
-    folder = "objects_detected" if detection_type == "object" else f"{detection_type}_alerts"
-    os.makedirs(folder, exist_ok=True)
-
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    label_part = f"_{label}" if label else ""
-    filename = f"{detection_type}_cam{cam_id}{label_part}_{timestamp}.jpg"
-    image_path = os.path.join(folder, filename)
-
-    cv2.imwrite(image_path, frame)
-    if os.path.exists(image_path) and os.path.getsize(image_path) > 0:
-        print(f"[INFO] {detection_type.capitalize()} detection frame saved: {image_path}")
-        return image_path
+    """Queues a detection frame on the snapshot writer and returns its reserved path."""
+    image_path = get_snapshot_writer().submit(cam_id, detection_type, frame=frame, label=label).path
+    if image_path:
+        print(f"[INFO] {detection_type.capitalize()} detection frame queued: {image_path}")
     else:
-        print(f"[ERROR] Failed to save {detection_type} detection image for Camera {cam_id}.")
+        print(f"[ERROR] {detection_type.capitalize()} detection image for Camera {cam_id} was dropped.")
+    return image_path
+
+class CameraPipelines:
+    """
+    The processes of each camera, keyed by CameraSetting id.
+
+    Each camera also gets a slot: the number in its shared memory name
+    (``video_frame_shm_<slot>``) and the cam_id its workers report. A slot is
+    kept for as long as the camera exists and is only reused after it is
+    removed, so adding or deleting one camera never renumbers the others.
+
+    ``apply`` compares new settings with what is running: a camera whose
+    source changed is restarted, detectors and the recorder are started or
+    stopped when they are switched on or off, and cameras that appear or
+    disappear are started or stopped. Threshold changes reach the running
+    detectors through the config channel instead.
+    """
+
+    def __init__(self, event_queue, config_channel, manager, clip_queues, clip_results, clips_enabled):
+        self.event_queue = event_queue
+        self.config_channel = config_channel
+        self.manager = manager
+        self.clip_queues = clip_queues
+        self.clip_results = clip_results
+        self.clips_enabled = clips_enabled
+        self.slots = {}  # camera id -> slot
+        self.pipelines = {}  # camera id -> {"slot", "shm", "config", "source", "processes": {role: Process}}
+
+    def assign_slots(self, camera_settings):
+        """
+        Sets ``slot`` on every camera's settings, giving new cameras the lowest free one.
+
+        Called before the settings are published, so workers see their slot.
+        Slots of removed cameras are only freed once ``apply`` stops them.
+        """
+        for cam_config in camera_settings:
+            key = cam_config["id"]
+            if key not in self.slots:
+                taken = set(self.slots.values())
+                self.slots[key] = next(slot for slot in range(len(taken) + 1) if slot not in taken)
+            cam_config["slot"] = self.slots[key]
+
+    def wanted_roles(self, cam_config):
+        roles = {"capture"}
+        if self.clips_enabled:
+            roles.add("clip")
+        if cam_config.get('continuousRecording'):
+            roles.add("recording")
+        roles.update(set(cam_config.get("detections", [])) & {"motion", "object", "face"})
+        return roles
+
+    def _process(self, role, key, pipeline):
+        cam_id = pipeline["slot"]
+        source = pipeline["source"]
+        cam_config = pipeline["config"]
+        shm_name = f"video_frame_shm_{cam_id}"
+        if role == "capture":
+            return mp.Process(target=video_capture_process, args=(shm_name, FRAME_SHAPE, source, cam_id))
+        if role == "clip":
+            if cam_id not in self.clip_queues:
+                self.clip_queues[cam_id] = self.manager.Queue()
+            return mp.Process(target=clip_recorder_process, args=(shm_name, FRAME_SHAPE, cam_id, self.clip_queues[cam_id], self.clip_results))
+        if role == "recording":
+            return mp.Process(target=segment_recorder_process, args=(shm_name, FRAME_SHAPE, cam_id, key))
+        if role == "motion":
+            return mp.Process(target=motion_detection_process, args=(shm_name, FRAME_SHAPE, self.event_queue, cam_id, cam_config.get('motionThreshold'),
+                                                                     cam_config.get('motionScale', 4), cam_config.get('motionMinArea', 200),
+                                                                     cam_config.get('motionZones'), cam_config.get('motionBackend', 'mog2'),
+                                                                     self.config_channel.reader(key)))
+        if role == "object":
+            return mp.Process(target=object_detection_process, args=(shm_name, FRAME_SHAPE, self.event_queue, cam_id, cam_config.get('objectThreshold'),
+                                                                     self.config_channel.reader(key)))
+        if role == "face":
+            return mp.Process(target=face_recognition_process, args=(shm_name, FRAME_SHAPE, self.event_queue, cam_id))
+
+    def _start_roles(self, key, roles):
+        pipeline = self.pipelines[key]
+        for role in roles:
+            process = self._process(role, key, pipeline)
+            process.start()
+            pipeline["processes"][role] = process
+
+    def _stop_roles(self, key, roles):
+        processes = self.pipelines[key]["processes"]
+        stopping = [processes.pop(role) for role in roles if role in processes]
+        for process in stopping:
+            if process.is_alive():
+                process.terminate()
+        for process in stopping:
+            process.join()
+
+    def start(self, key, cam_config):
+        pipeline = self.pipelines.get(key)
+        if pipeline is None:
+            slot = cam_config["slot"]
+            shm = create_shared_memory(f"video_frame_shm_{slot}", int(np.prod(FRAME_SHAPE)))
+            pipeline = self.pipelines[key] = {"slot": slot, "shm": shm, "processes": {}}
+        pipeline["config"] = cam_config
+        try:
+            pipeline["source"] = int(cam_config["source"])  # directly use index
+        except (KeyError, ValueError):
+            pipeline["source"] = None
+            print(f"[ERROR] Invalid camera source in config: {cam_config.get('source')}")
+            return
+        self._start_roles(key, self.wanted_roles(cam_config))
+
+    def stop(self, key, release_memory=True):
+        pipeline = self.pipelines.get(key)
+        if pipeline is None:
+            return
+        self._stop_roles(key, list(pipeline["processes"]))
+        if release_memory:
+            pipeline["shm"].close()
+            pipeline["shm"].unlink()
+            del self.pipelines[key]
+            self.slots.pop(key, None)
+
+    def apply(self, camera_settings):
+        wanted = {cam_config["id"]: cam_config for cam_config in camera_settings}
+        for key in list(self.pipelines):
+            if key not in wanted:
+                print(f"[INFO] Camera {self.pipelines[key]['slot']} removed, stopping its pipeline")
+                self.stop(key)
+        # Slots of cameras removed before they ever started
+        for key in list(self.slots):
+            if key not in wanted and key not in self.pipelines:
+                del self.slots[key]
+
+        for key, new in wanted.items():
+            pipeline = self.pipelines.get(key)
+            cam_id = new["slot"]
+            if pipeline is None:
+                print(f"[INFO] Starting pipeline for Camera {cam_id}")
+                self.start(key, new)
+            elif new.get("source") != pipeline["config"].get("source"):
+                print(f"[INFO] Camera {cam_id} source changed, restarting its pipeline")
+                self.stop(key, release_memory=False)
+                self.start(key, new)
+            else:
+                old_roles = self.wanted_roles(pipeline["config"])
+                new_roles = self.wanted_roles(new)
+                old_config, pipeline["config"] = pipeline["config"], new
+                if pipeline["source"] is None:
+                    continue
+                # Running detectors pick these up from the config channel once it is published
+                for role, setting in (("motion", "motionThreshold"), ("object", "objectThreshold")):
+                    if role in old_roles & new_roles and new.get(setting) != old_config.get(setting):
+                        print(f"[INFO] Camera {cam_id}: sending {setting} {new.get(setting)} to the running {role} detector")
+                if old_roles != new_roles:
+                    print(f"[INFO] Camera {cam_id}: starting {sorted(new_roles - old_roles)}, stopping {sorted(old_roles - new_roles)}")
+                self._stop_roles(key, old_roles - new_roles)
+                self._start_roles(key, new_roles - old_roles)
+
+    def stop_all(self):
+        for key in list(self.pipelines):
+            self.stop(key)
+
+
+def config_watermark():
+    """Cheap change check for the camera settings: latest updated_at and row count."""
+    try:
+        watermark = db.session.query(db.func.max(CameraSetting.updated_at), db.func.count(CameraSetting.id)).one()
+        db.session.commit()  # End the read transaction so the next poll sees new commits
+        return tuple(watermark)
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Failed to check camera settings: {e}")
         return None
 
+
 def main():
     """Main entry point for the security monitoring system"""
     with app.app_context():
         camera_settings = load_camera_settings()
-        shared_mem_list = []
+        manager = mp.Manager()
         processes = []
 
-        object_queue = mp.Queue()
-        face_queue = mp.Queue()
-        motion_queue = mp.Queue()
-
-        for i, cam_config in enumerate(camera_settings):
-            shm_name = f"video_frame_shm_{i}"
-            detections = cam_config.get("detections", [])
+        # Single event channel from every detector into the alert process
+        event_queue = mp.Queue()
+        # Emails are delivered from the outbox by their own processes so alerting never waits on SMTP;
+        # this queue only wakes them up early
+        notify_queue = mp.Queue(maxsize=100)
+        notify_workers = int(os.getenv('NOTIFY_WORKERS', 1))
 
-            shm = create_shared_memory(shm_name, int(np.prod(FRAME_SHAPE)))
-            shared_mem_list.append(shm)
+        # Live camera settings for the running workers
+        config_channel = ConfigChannel(manager)
 
-            try:
-                source = int(cam_config["source"])  # directly use index
-            except (KeyError, ValueError):
-                print(f"[ERROR] Invalid camera source in config: {cam_config.get('source')}")
-                continue
+        clips_enabled = os.getenv('ENABLE_ALERT_CLIPS', 'True').lower() == 'true'
+        # Shared so cameras added while running get a clip queue the alert process can see
+        clip_queues = manager.dict()
+        # Each clip recorder encodes its own clips and only reports (alert_ids, path) here
+        clip_results = mp.Queue()
 
-            processes.append(mp.Process(target=video_capture_process, args=(shm_name, FRAME_SHAPE, source, i)))
-
-            if "motion" in detections:
-                processes.append(mp.Process(target=motion_detection_process, args=(shm_name, FRAME_SHAPE, motion_queue, i,cam_config.get('motionThreshold'))))
-            if "object" in detections:
-                processes.append(mp.Process(target=object_detection_process, args=(shm_name, FRAME_SHAPE, object_queue, i,cam_config.get('objectThreshold'))))
-            if "face" in detections:
-                processes.append(mp.Process(target=face_recognition_process, args=(shm_name, FRAME_SHAPE, face_queue, i)))
+        pipelines = CameraPipelines(event_queue, config_channel, manager, clip_queues, clip_results, clips_enabled)
+        # Workers and the alert process find their camera by slot, so slots are set before publishing
+        pipelines.assign_slots(camera_settings)
+        config_channel.publish(camera_settings)
 
         # Add alert process once, not inside loop
-        processes.append(mp.Process(target=alert_process, args=(object_queue, face_queue, motion_queue)))
+        processes.append(mp.Process(target=alert_process, args=(event_queue, clip_queues, clip_results, notify_queue, config_channel)))
+        for _ in range(notify_workers):
+            processes.append(mp.Process(target=notification_dispatcher_process, args=(notify_queue,)))
+        processes.append(mp.Process(target=digest_process, args=(notify_queue,)))
+        processes.append(mp.Process(target=snapshot_retention_process))
 
         try:
+            pipelines.apply(camera_settings)
             for p in processes:
                 p.start()
-            for p in processes:
-                p.join()
+
+            # Watch the settings and reconfigure only what changed
+            watermark = config_watermark()
+            while True:
+                time.sleep(CONFIG_POLL_SECONDS)
+                current = config_watermark()
+                if current is None or current == watermark:
+                    continue
+                watermark = current
+                camera_settings = load_camera_settings()
+                print(f"[INFO] Camera settings changed, applying {len(camera_settings)} cameras")
+                pipelines.assign_slots(camera_settings)
+                # Published after the pipelines are applied, so a reused slot's shared memory is
+                # already recreated when the alert process re-attaches to it
+                pipelines.apply(camera_settings)
+                config_channel.publish(camera_settings)
         finally:
             print("\n[INFO] Shutting down all processes...")
+            pipelines.stop_all()
             for p in processes:
                 if p.is_alive():
                     p.terminate()
                     p.join()
-            for shm in shared_mem_list:
-                shm.close()
-                shm.unlink()
+            manager.shutdown()
             print("[INFO] Cleanup complete.")
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+import os
+import smtplib
+import time
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.mime.base import MIMEBase
+from email import encoders
+from queue import Empty, Full
+
+from .outbox import OUTBOX_BATCH_SIZE, claim_batch, mark_delivered, mark_failed
+
+# 🔹 Dispatcher settings
+MAIL_MAX_RETRIES = int(os.getenv("MAIL_MAX_RETRIES", 5))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", 2))
+MAIL_RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", 300))
+MAIL_IDLE_CHECK_SECONDS = 60  # NOOP a connection idle for longer than this before reusing it
+RECIPIENT_CACHE_SECONDS = 60
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", 5))
+
+
+class MailConfig:
+    """
+    SMTP settings read from the MAIL_* environment variables.
+
+    To test against a local stand-in, run ``python -m aiosmtpd -n -l localhost:8025``
+    and set MAIL_SERVER=localhost, MAIL_PORT=8025, MAIL_USE_TLS=False and leave
+    MAIL_PASSWORD empty so no login is attempted.
+    """
+
+    def __init__(self, server, port, use_tls, use_ssl, username, password, sender, timeout=30):
+        self.server = server
+        self.port = port
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.timeout = timeout
+
+    @classmethod
+    def from_env(cls):
+        from dotenv import load_dotenv
+        load_dotenv()
+        username = os.getenv("MAIL_USERNAME")
+        return cls(
+            server=os.getenv("MAIL_SERVER", "smtp.gmail.com"),
+            port=int(os.getenv("MAIL_PORT", 587)),
+            use_tls=os.getenv("MAIL_USE_TLS", "True").lower() == "true",
+            use_ssl=os.getenv("MAIL_USE_SSL", "False").lower() == "true",
+            username=username,
+            password=os.getenv("MAIL_PASSWORD"),
+            sender=os.getenv("MAIL_DEFAULT_SENDER") or username,
+            timeout=float(os.getenv("MAIL_TIMEOUT", 30)),
+        )
+
+
+class SMTPConnection:
+    """One persistent, authenticated SMTP session that reconnects when the server drops it."""
+
+    def __init__(self, config):
+        self.config = config
+        self.server = None
+        self.last_used = 0.0
+
+    def _connect(self):
+        config = self.config
+        if config.use_ssl:
+            server = smtplib.SMTP_SSL(config.server, config.port, timeout=config.timeout)
+        else:
+            server = smtplib.SMTP(config.server, config.port, timeout=config.timeout)
+            if config.use_tls:
+                server.starttls()
+        if config.username and config.password:
+            server.login(config.username, config.password)
+        print(f"[INFO] SMTP connection opened to {config.server}:{config.port}")
+        return server
+
+    def _is_alive(self):
+        if self.server is None:
+            return False
+        if time.time() - self.last_used < MAIL_IDLE_CHECK_SECONDS:
+            return True
+        try:
+            return self.server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def send(self, msg, recipients):
+        """Sends one message to every recipient, reconnecting once if the session has gone stale."""
+        for attempt in range(2):
+            if not self._is_alive():
+                self.close()
+                self.server = self._connect()
+            try:
+                refused = self.server.send_message(msg, from_addr=self.config.sender, to_addrs=recipients)
+                self.last_used = time.time()
+                return refused
+            except smtplib.SMTPServerDisconnected:
+                self.server = None
+                if attempt:
+                    raise
+
+    def close(self):
+        if self.server is not None:
+            try:
+                self.server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self.server = None
+
+
+class RecipientCache:
+    """Active users' email addresses and delivery policies, refreshed from the database at most once per TTL."""
+
+    def __init__(self, ttl=RECIPIENT_CACHE_SECONDS):
+        self.ttl = ttl
+        self.users = []  # (email, immediate severities)
+        self.loaded_at = 0.0
+
+    def get(self, severity=None):
+        """Addresses to email at once; with a severity, only users whose policy sends it immediately."""
+        if time.time() - self.loaded_at >= self.ttl:
+            self.users = self._load()
+            self.loaded_at = time.time()
+        return [email for email, immediate in self.users if severity is None or severity in immediate]
+
+    def _load(self):
+        from ..web.app import User, app
+        try:
+            with app.app_context():
+                users = [(user.email, user.immediate_severities()) for user in User.query.filter(
+                    User.email.isnot(None),
+                    User.email != '',
+                    User.is_active == True
+                ).all()]
+        except Exception as e:
+            print(f"[ERROR] Failed to get users from database: {e}")
+            users = []
+        if not users:
+            admin_email = os.getenv('ADMIN_EMAIL', os.getenv('MAIL_USERNAME'))
+            print("[WARNING] No active users with email addresses found. Sending to admin only.")
+            users = [(admin_email, ['high', 'medium', 'low'])] if admin_email else []
+        return users
+
+
+def build_message(sender, subject, message, attachment_path=None):
+    """Builds the alert email once; recipients go in the envelope only, so they stay Bcc."""
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = sender
+    msg['Subject'] = subject
+
+    body = f"""
+IVSS Security Alert
+
+Dear User,
+
+{message}
+
+Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+
+This is an automated security alert from your IVSS Surveillance System.
+
+---
+IVSS Security Team
+    """
+    msg.attach(MIMEText(body, 'plain'))
+
+    if attachment_path and os.path.exists(attachment_path) and os.path.getsize(attachment_path) > 0:
+        with open(attachment_path, "rb") as attachment:
+            part = MIMEBase("application", "octet-stream")
+            part.set_payload(attachment.read())
+            encoders.encode_base64(part)
+            part.add_header("Content-Disposition", f"attachment; filename={os.path.basename(attachment_path)}")
+            msg.attach(part)
+    return msg
+
+
+def retry_delay(attempt):
+    """Exponential backoff: 2 s, 4 s, 8 s ... capped at MAIL_RETRY_MAX_SECONDS."""
+    return min(MAIL_RETRY_BASE_SECONDS * (2 ** (attempt - 1)), MAIL_RETRY_MAX_SECONDS)
+
+
+def ring(notify_queue):
+    """Wakes a dispatcher after new outbox rows are committed, instead of waiting for its next poll."""
+    if notify_queue is not None:
+        try:
+            notify_queue.put_nowait(True)
+        except Full:
+            pass
+
+
+# 🔥 Notification Dispatcher Process
+def notification_dispatcher_process(notify_queue, poll_seconds=OUTBOX_POLL_SECONDS):
+    """
+    Delivers notifications from the outbox over a single pooled SMTP connection.
+
+    Rows are claimed in batches, so several dispatchers can run side by side.
+    Each row becomes one message addressed to all of its recipients. Failed
+    rows go back to ``pending`` with exponential backoff until
+    MAIL_MAX_RETRIES attempts have been made. ``notify_queue`` only wakes the
+    dispatcher early; the outbox table is the source of truth, so nothing is
+    lost when the process restarts.
+    """
+    if os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() != 'true':
+        print("[INFO] Email notifications are disabled.")
+        return
+
+    config = MailConfig.from_env()
+    if not config.sender:
+        print("[ERROR] Email sender not configured. Check your .env file.")
+        return
+
+    from ..web.app import app
+    connection = SMTPConnection(config)
+    recipient_cache = RecipientCache()
+
+    def deliver(row):
+        recipients = [row.recipient] if row.recipient else recipient_cache.get(row.severity)
+        if not recipients:
+            print(f"[INFO] Nobody is subscribed to immediate {row.severity} alerts: {row.subject}")
+            return
+        msg = build_message(config.sender, row.subject, row.message, row.attachment_path)
+        refused = connection.send(msg, recipients)
+        print(f"[INFO] Email sent to {len(recipients) - len(refused or {})} recipients: {row.subject}")
+
+    try:
+        with app.app_context():
+            while True:
+                rows = claim_batch()
+                delivered = []
+                for row in rows:
+                    try:
+                        deliver(row)
+                        delivered.append(row)
+                    except (smtplib.SMTPException, OSError) as e:
+                        connection.close()
+                        mark_failed(row, e, MAIL_MAX_RETRIES, retry_delay)
+                if delivered:
+                    mark_delivered(delivered)
+                if len(rows) == OUTBOX_BATCH_SIZE:
+                    continue  # More may be waiting
+
+                try:
+                    wake = notify_queue.get(timeout=poll_seconds)
+                    while wake is not None:  # Collapse a burst of wake-ups into one claim
+                        wake = notify_queue.get_nowait()
+                except Empty:
+                    continue
+                break  # None is the shutdown sentinel
+    finally:
+        connection.close()
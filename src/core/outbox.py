@@ -0,0 +1,142 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from ..web.app import NotificationOutbox, db
+
+# 🔹 Outbox settings
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 20))
+OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", 300))  # Claims older than this are taken back
+# Held rows are released when their incident closes; one still held after this long is sent as it is
+OUTBOX_HOLD_SECONDS = int(os.getenv("OUTBOX_HOLD_SECONDS", 600))
+
+
+def add_to_outbox(alert_id, subject, message, attachment_path=None, recipient=None, severity=None, channel="email",
+                  status="pending"):
+    """
+    Adds a notification to the current session without committing.
+
+    The caller commits it together with the alert change it belongs to, so an
+    alert is never saved without its notification (or the other way round).
+    A ``held`` notification is not sent until ``release_for_alert`` (or
+    ``OUTBOX_HOLD_SECONDS`` passing) makes it pending.
+    """
+    entry = NotificationOutbox(
+        alert_id=alert_id,
+        channel=channel,
+        recipient=recipient,
+        severity=severity,
+        subject=subject[:200],
+        message=message,
+        attachment_path=attachment_path,
+        status=status,
+    )
+    db.session.add(entry)
+    return entry
+
+
+def release_for_alert(alert_id, message, attachment_path=None):
+    """
+    Puts the final text on an alert's unsent notifications, without committing.
+
+    Held notifications become pending; ones already pending just get the new
+    text. Notifications that are being or have been sent are left alone.
+
+    Returns:
+        int: the number of notifications released.
+    """
+    now = datetime.utcnow()
+    released = 0
+    rows = NotificationOutbox.query.filter(NotificationOutbox.alert_id == alert_id,
+                                           NotificationOutbox.status.in_(['held', 'pending'])).all()
+    for row in rows:
+        row.message = message
+        if attachment_path:
+            row.attachment_path = attachment_path
+        if row.status == 'held':
+            row.status = 'pending'
+            row.next_attempt_at = now
+            released += 1
+    return released
+
+
+def _claimable(now):
+    """Pending rows that are due, rows whose worker's lease has run out, and rows held for too long."""
+    stale = now - timedelta(seconds=OUTBOX_LEASE_SECONDS)
+    # A held row outlives its incident only if the alert process stopped before closing it
+    abandoned = now - timedelta(seconds=OUTBOX_HOLD_SECONDS)
+    return db.or_(
+        db.and_(NotificationOutbox.status == 'pending', NotificationOutbox.next_attempt_at <= now),
+        db.and_(NotificationOutbox.status == 'sending', NotificationOutbox.claimed_at < stale),
+        db.and_(NotificationOutbox.status == 'held', NotificationOutbox.created_at < abandoned),
+    )
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Claims up to ``batch_size`` due notifications for this worker.
+
+    On PostgreSQL the rows are locked with ``FOR UPDATE SKIP LOCKED`` so
+    concurrent workers never wait on each other. SQLite has no row locks, so
+    a single UPDATE stamps the rows with a claim token under the database
+    write lock and the worker then reads back what it won.
+
+    Returns:
+        list[NotificationOutbox]: the claimed rows, with status ``sending``.
+    """
+    now = datetime.utcnow()
+    token = str(uuid.uuid4())
+    try:
+        if db.engine.dialect.name == 'postgresql':
+            rows = (NotificationOutbox.query
+                    .filter(_claimable(now))
+                    .order_by(NotificationOutbox.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                    .all())
+            for row in rows:
+                row.status = 'sending'
+                row.claim_token = token
+                row.claimed_at = now
+            db.session.commit()
+            return rows
+
+        due_ids = (db.session.query(NotificationOutbox.id)
+                   .filter(_claimable(now))
+                   .order_by(NotificationOutbox.id)
+                   .limit(batch_size)
+                   .scalar_subquery())
+        (NotificationOutbox.query
+         .filter(NotificationOutbox.id.in_(due_ids))
+         .update({'status': 'sending', 'claim_token': token, 'claimed_at': now}, synchronize_session=False))
+        db.session.commit()
+        return NotificationOutbox.query.filter_by(claim_token=token).order_by(NotificationOutbox.id).all()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[ERROR] Failed to claim notifications: {e}")
+        return []
+
+
+def mark_delivered(rows):
+    now = datetime.utcnow()
+    for row in rows:
+        row.status = 'delivered'
+        row.attempts += 1
+        row.delivered_at = now
+        row.last_error = None
+    db.session.commit()
+
+
+def mark_failed(row, error, max_attempts, retry_delay):
+    """Schedules another attempt after ``retry_delay(attempts)`` seconds, or gives up after ``max_attempts``."""
+    row.attempts += 1
+    row.last_error = str(error)[:255]
+    if row.attempts >= max_attempts:
+        row.status = 'failed'
+        print(f"[ERROR] Giving up on notification {row.id} after {row.attempts} attempts: {error}")
+    else:
+        delay = retry_delay(row.attempts)
+        row.status = 'pending'
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        print(f"[WARNING] Notification {row.id} failed ({error}); retrying in {delay:.0f} s")
+    db.session.commit()
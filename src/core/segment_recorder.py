@@ -0,0 +1,262 @@
+import os
+import shutil
+import signal
+import sqlite3
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+RECORDING_DIR = os.path.join("data", "recordings")
+RECORDING_INDEX_PATH = os.path.join(RECORDING_DIR, "index.db")
+RECORDING_FPS = int(os.getenv("RECORDING_FPS", 10))
+SEGMENT_SECONDS = int(os.getenv("RECORDING_SEGMENT_SECONDS", 60))
+RECORDING_RETENTION_DAYS = float(os.getenv("RECORDING_RETENTION_DAYS", 7))
+
+# cam_id is the shared-memory slot the segment was recorded from; camera_id is the
+# CameraSetting id, which stays with the camera when slots are reused
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    cam_id INTEGER NOT NULL,
+    camera_id INTEGER,
+    start_ts REAL NOT NULL,
+    end_ts REAL,
+    path TEXT NOT NULL UNIQUE,
+    frames INTEGER NOT NULL DEFAULT 0,
+    fps REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_segments_cam_start ON segments (cam_id, start_ts);
+"""
+CAMERA_ID_INDEX = "CREATE INDEX IF NOT EXISTS idx_segments_camera_start ON segments (camera_id, start_ts)"
+
+
+class RecordingIndex:
+    """
+    Maps wall-clock time to recorded segment files, one row per segment.
+
+    Segments are looked up by CameraSetting id. Segments recorded before the
+    index had that column are only known by slot, which may since have been
+    given to another camera, so they are no longer found by ``locate``;
+    ``prune`` still removes them once they age out.
+    """
+
+    def __init__(self, path=RECORDING_INDEX_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(segments)")}
+        with self.conn:
+            if "camera_id" not in columns:
+                self.conn.execute("ALTER TABLE segments ADD COLUMN camera_id INTEGER")
+            self.conn.execute(CAMERA_ID_INDEX)
+
+    def open_segment(self, cam_id, camera_id, start_ts, path, fps):
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR REPLACE INTO segments (cam_id, camera_id, start_ts, path, fps) VALUES (?, ?, ?, ?, ?)",
+                (cam_id, camera_id, start_ts, path, fps),
+            )
+        return cursor.lastrowid
+
+    def close_segment(self, segment_id, end_ts, frames):
+        with self.conn:
+            self.conn.execute("UPDATE segments SET end_ts = ?, frames = ? WHERE id = ?", (end_ts, frames, segment_id))
+
+    def locate(self, camera_id, ts):
+        """
+        Finds the segment covering ``ts`` for a camera (a CameraSetting id).
+
+        Returns:
+            dict: ``id``, ``path`` and ``offset`` (seconds into the file), or None
+            if nothing was recorded at that time.
+        """
+        row = self.conn.execute(
+            "SELECT id, start_ts, end_ts, path, frames, fps FROM segments "
+            "WHERE camera_id = ? AND start_ts <= ? ORDER BY start_ts DESC LIMIT 1",
+            (camera_id, ts),
+        ).fetchone()
+        if row is None:
+            return None
+        segment_id, start_ts, end_ts, path, frames, fps = row
+        if end_ts is not None and ts >= end_ts:
+            return None
+        offset = ts - start_ts
+        if end_ts is not None and frames:
+            offset = min(offset, frames / fps)
+        return {"id": segment_id, "path": path, "start": start_ts, "end": end_ts, "offset": offset}
+
+    def get(self, segment_id):
+        row = self.conn.execute("SELECT cam_id, camera_id, path FROM segments WHERE id = ?", (segment_id,)).fetchone()
+        return {"cam_id": row[0], "camera_id": row[1], "path": row[2]} if row else None
+
+    def prune(self, before_ts):
+        """
+        Deletes the segments of every camera, removed ones included, that ended before ``before_ts``.
+
+        A segment left open by a recorder that was killed has no end time; it
+        is pruned by its start, since no segment is longer than a few minutes.
+        Segments whose file could not be removed are kept for the next pass.
+        """
+        rows = self.conn.execute(
+            "SELECT id, path FROM segments WHERE end_ts < ? OR (end_ts IS NULL AND start_ts < ?)",
+            (before_ts, before_ts),
+        ).fetchall()
+        removed, directories = [], set()
+        for segment_id, path in rows:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[ERROR] Failed to delete recording {path}: {e}")
+                continue
+            removed.append((segment_id,))
+            directories.add(os.path.dirname(path))
+        with self.conn:
+            self.conn.executemany("DELETE FROM segments WHERE id = ?", removed)
+        # Drop day/camera folders that are now empty
+        for directory in directories:
+            try:
+                os.rmdir(directory)
+                os.rmdir(os.path.dirname(directory))
+            except OSError:
+                pass
+        return len(removed)
+
+    def close(self):
+        self.conn.close()
+
+
+class _FFmpegSegment:
+    """Segment written through an ffmpeg rawvideo pipe (H.264)."""
+
+    def __init__(self, path, size, fps):
+        width, height = size
+        self.process = subprocess.Popen(
+            ["ffmpeg", "-loglevel", "error", "-y",
+             "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "-",
+             "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+             path],
+            stdin=subprocess.PIPE,
+        )
+
+    def is_open(self):
+        return self.process.poll() is None
+
+    def write(self, frame):
+        self.process.stdin.write(frame.tobytes())
+
+    def release(self):
+        """Finishes the file; returns False if ffmpeg failed."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        return self.process.wait() == 0
+
+
+class _OpenCVSegment:
+    """Fallback segment writer when ffmpeg is not installed."""
+
+    def __init__(self, path, size, fps):
+        self.writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+
+    def is_open(self):
+        return self.writer.isOpened()
+
+    def write(self, frame):
+        self.writer.write(frame)
+
+    def release(self):
+        self.writer.release()
+        return True
+
+
+def video_writer_class():
+    """H.264 through ffmpeg, which browsers can play, when it is installed; OpenCV's mp4v otherwise."""
+    return _FFmpegSegment if shutil.which("ffmpeg") else _OpenCVSegment
+
+
+def segment_path(camera_id, start_ts, output_dir=RECORDING_DIR):
+    local = time.localtime(start_ts)
+    return os.path.join(output_dir, time.strftime("%Y%m%d", local), f"cam{camera_id}",
+                        f"seg_cam{camera_id}_{time.strftime('%Y%m%d_%H%M%S', local)}.mp4")
+
+
+def segment_recorder_process(shm_name, shape, cam_id, camera_id=None, fps=RECORDING_FPS,
+                             segment_seconds=SEGMENT_SECONDS, output_dir=RECORDING_DIR,
+                             index_path=RECORDING_INDEX_PATH):
+    """
+    Continuously records a camera's shared memory into fixed-length segments.
+
+    Segments start on wall-clock multiples of ``segment_seconds`` and each one is
+    registered in the recording index, under the camera's CameraSetting id
+    (``camera_id``), when opened and closed. When sampling falls behind, the
+    last frame is repeated so that file offsets stay aligned with wall-clock
+    time. This process only reads the capture shm, so detectors are never
+    slowed by encoding. Old segments are pruned by the retention process.
+    """
+    if camera_id is None:
+        camera_id = cam_id
+    # main() stops workers with terminate(); exit cleanly so the open segment is finalised
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    shared_mem = shared_memory.SharedMemory(name=shm_name)
+    frame_buffer = np.ndarray(shape, dtype=np.uint8, buffer=shared_mem.buf)
+    size = (shape[1], shape[0])
+    segment_cls = video_writer_class()
+    index = RecordingIndex(index_path)
+    interval = 1.0 / fps
+
+    print(f"[INFO] Continuous recording started for Camera {cam_id} "
+          f"({segment_seconds}s segments, {fps} fps, {segment_cls.__name__.strip('_')})")
+
+    segment = None
+    segment_id = None
+    segment_start = segment_end = 0
+    frames = 0
+
+    def close_current():
+        segment.release()
+        index.close_segment(segment_id, segment_start + frames * interval, frames)
+
+    try:
+        next_tick = time.time()
+        while True:
+            now = time.time()
+            if segment is None or now >= segment_end:
+                if segment is not None:
+                    close_current()
+
+                segment_start = now
+                segment_end = (now // segment_seconds + 1) * segment_seconds
+                path = segment_path(camera_id, segment_start, output_dir)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                segment = segment_cls(path, size, fps)
+                segment_id = index.open_segment(cam_id, camera_id, segment_start, path, fps)
+                frames = 0
+                next_tick = now
+
+            frame = frame_buffer.copy()
+            # Repeat the frame for any ticks missed so the timeline stays aligned
+            due = max(1, int((now - next_tick) / interval) + 1)
+            for _ in range(due):
+                segment.write(frame)
+            frames += due
+            next_tick += due * interval
+
+            delay = next_tick - time.time()
+            if delay > 0:
+                time.sleep(delay)
+    finally:
+        if segment is not None:
+            close_current()
+        index.close()
+        shared_mem.close()
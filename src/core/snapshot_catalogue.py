@@ -0,0 +1,214 @@
+import os
+import sqlite3
+import time
+
+from ..web.thumbnails import prune_thumbnails
+from .segment_recorder import RecordingIndex, RECORDING_INDEX_PATH, RECORDING_RETENTION_DAYS
+
+CATALOGUE_PATH = os.getenv("SNAPSHOT_CATALOGUE_PATH", os.path.join("data", "snapshots", "catalogue.db"))
+RETENTION_DAYS = float(os.getenv("SNAPSHOT_RETENTION_DAYS", 30))
+QUOTA_MB_PER_CAMERA = float(os.getenv("SNAPSHOT_QUOTA_MB_PER_CAMERA", 2048))
+RETENTION_INTERVAL = 300  # seconds between retention passes
+THUMBNAIL_DIR = os.path.join("data", "thumbnails")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    cam_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_cam_time ON snapshots (cam_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_snapshots_kind_time ON snapshots (kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_snapshots_time ON snapshots (created_at);
+"""
+
+
+class SnapshotCatalogue:
+    """
+    SQLite index of every snapshot on disk, keyed by camera, type and time.
+
+    Detector processes add rows through their snapshot writer and the retention
+    worker deletes from it, so the database runs in WAL mode to let them share it.
+    Listing and cleanup never walk the snapshot directories.
+    """
+
+    def __init__(self, path=CATALOGUE_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, records):
+        """Inserts ``(cam_id, kind, created_at, path, size)`` tuples in one transaction."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO snapshots (cam_id, kind, created_at, path, size) VALUES (?, ?, ?, ?, ?)",
+                records,
+            )
+
+    def list(self, cam_id=None, kind=None, since=None, until=None, limit=100):
+        """Newest-first snapshots matching the filters, as dicts."""
+        clauses, params = [], []
+        if cam_id is not None:
+            clauses.append("cam_id = ?")
+            params.append(cam_id)
+        if kind is not None:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(limit)
+
+        rows = self.conn.execute(
+            f"SELECT id, cam_id, kind, created_at, path, size FROM snapshots {where} "
+            f"ORDER BY created_at DESC LIMIT ?",
+            params,
+        ).fetchall()
+        return [
+            {"id": row[0], "cam_id": row[1], "kind": row[2], "created_at": row[3], "path": row[4], "size": row[5]}
+            for row in rows
+        ]
+
+    def usage_by_camera(self):
+        return dict(self.conn.execute("SELECT cam_id, SUM(size) FROM snapshots GROUP BY cam_id").fetchall())
+
+    def _delete_batch(self, rows):
+        """
+        Removes the files of ``(id, path, size)`` rows and then their index entries.
+
+        Rows whose file could not be removed stay in the index, so a later
+        pass tries them again instead of leaving an orphan on disk.
+
+        Returns:
+            tuple: (files deleted, bytes freed)
+        """
+        directories = set()
+        removed = []
+        for row in rows:
+            path = row[1]
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[ERROR] Failed to delete snapshot {path}: {e}")
+                continue
+            removed.append(row)
+            directories.add(os.path.dirname(path))
+
+        with self.conn:
+            self.conn.executemany("DELETE FROM snapshots WHERE id = ?", [(row[0],) for row in removed])
+
+        # Drop day/camera shards that are now empty
+        for directory in directories:
+            try:
+                os.rmdir(directory)
+                os.rmdir(os.path.dirname(directory))
+            except OSError:
+                pass
+
+        return len(removed), sum(row[2] for row in removed)
+
+    def enforce_retention(self, max_age_days=RETENTION_DAYS, max_bytes_per_camera=None, batch_size=500):
+        """
+        Deletes snapshots older than ``max_age_days``, then the oldest snapshots of
+        every camera above ``max_bytes_per_camera``, in batches of ``batch_size``.
+
+        Returns:
+            tuple: (files deleted, bytes freed)
+        """
+        deleted, freed = 0, 0
+
+        if max_age_days:
+            cutoff = time.time() - max_age_days * 86400
+            while True:
+                rows = self.conn.execute(
+                    "SELECT id, path, size FROM snapshots WHERE created_at < ? ORDER BY created_at LIMIT ?",
+                    (cutoff, batch_size),
+                ).fetchall()
+                if not rows:
+                    break
+                batch_deleted, batch_freed = self._delete_batch(rows)
+                deleted += batch_deleted
+                freed += batch_freed
+                if not batch_deleted:
+                    break  # Only files that cannot be removed right now are left at the front
+
+        if max_bytes_per_camera:
+            for cam_id, usage in self.usage_by_camera().items():
+                while usage > max_bytes_per_camera:
+                    rows = self.conn.execute(
+                        "SELECT id, path, size FROM snapshots WHERE cam_id = ? ORDER BY created_at LIMIT ?",
+                        (cam_id, batch_size),
+                    ).fetchall()
+                    if not rows:
+                        break
+                    # Only take as much of the batch as is needed to get under quota
+                    excess, needed = usage - max_bytes_per_camera, 0
+                    for count, row in enumerate(rows, start=1):
+                        needed += row[2]
+                        if needed >= excess:
+                            rows = rows[:count]
+                            break
+                    batch_deleted, batch_freed = self._delete_batch(rows)
+                    usage -= batch_freed
+                    freed += batch_freed
+                    deleted += batch_deleted
+                    if not batch_deleted:
+                        break
+
+        return deleted, freed
+
+    def close(self):
+        self.conn.close()
+
+
+def snapshot_retention_process(max_age_days=RETENTION_DAYS, quota_mb_per_camera=QUOTA_MB_PER_CAMERA,
+                               interval=RETENTION_INTERVAL, catalogue_path=CATALOGUE_PATH, thumbnail_dir=THUMBNAIL_DIR,
+                               recording_retention_days=RECORDING_RETENTION_DAYS,
+                               recording_index_path=RECORDING_INDEX_PATH):
+    """
+    Periodically enforces snapshot age and per-camera size quotas from the
+    catalogue, and prunes old thumbnails and continuous recordings.
+
+    Recordings are pruned here rather than by each recorder, so cameras that
+    were removed, or whose recording was switched off, are pruned as well.
+    """
+
+    catalogue = SnapshotCatalogue(catalogue_path)
+    recordings = RecordingIndex(recording_index_path)
+    max_bytes = int(quota_mb_per_camera * 1024 * 1024) if quota_mb_per_camera else None
+    print(f"[INFO] Snapshot retention started: {max_age_days} days, {quota_mb_per_camera} MB per camera")
+
+    try:
+        while True:
+            try:
+                deleted, freed = catalogue.enforce_retention(max_age_days, max_bytes)
+                if deleted:
+                    print(f"[INFO] Snapshot retention removed {deleted} files ({freed / (1024 * 1024):.1f} MB)")
+                if max_age_days:
+                    pruned = prune_thumbnails(thumbnail_dir, max_age_days)
+                    if pruned:
+                        print(f"[INFO] Snapshot retention removed {pruned} cached thumbnails")
+                if recording_retention_days:
+                    pruned = recordings.prune(time.time() - recording_retention_days * 86400)
+                    if pruned:
+                        print(f"[INFO] Recording retention removed {pruned} segments")
+            except Exception as e:
+                print(f"[ERROR] Snapshot retention pass failed: {e}")
+            time.sleep(interval)
+    finally:
+        catalogue.close()
+        recordings.close()
@@ -0,0 +1,260 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from .snapshot_catalogue import SnapshotCatalogue, CATALOGUE_PATH
+
+# Base directory per snapshot type; files are sharded below as <YYYYMMDD>/cam<id>/
+SNAPSHOT_DIRS = {
+    "motion": os.path.join("data", "alerts", "motion_alerts"),
+    "face": os.path.join("data", "alerts", "face_alerts"),
+    "object": "objects_detected",
+    "invalid": "invalid_frames",
+    "alert": os.path.join("data", "alerts", "alert_frames"),
+}
+
+JPEG_QUALITY = int(os.getenv("SNAPSHOT_JPEG_QUALITY", 90))
+QUEUE_SIZE = int(os.getenv("SNAPSHOT_QUEUE_SIZE", 32))
+# A snapshot within this Hamming distance of a recent one for the same camera is not written
+DEDUP_DISTANCE = int(os.getenv("SNAPSHOT_DEDUP_DISTANCE", 6))
+DEDUP_HISTORY = int(os.getenv("SNAPSHOT_DEDUP_HISTORY", 4))
+# Older snapshots are never used as representatives, so alerts do not point at files retention may have removed
+DEDUP_SECONDS = float(os.getenv("SNAPSHOT_DEDUP_SECONDS", 30))
+
+
+def dhash(frame):
+    """64-bit difference hash of a frame, computed on a 9x8 grayscale thumbnail."""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    thumb = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = thumb[:, 1:] > thumb[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class PendingSnapshot(Future):
+    """Future resolving to the final path of a snapshot, or None if it was not written.
+
+    ``path`` is reserved up front so detectors can publish it immediately; the
+    file only appears there once it is complete.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+
+class _SnapshotJob:
+    __slots__ = ("key", "frame", "encoded", "path", "future", "created_at")
+
+    def __init__(self, key, frame, encoded, path):
+        self.key = key
+        self.frame = frame
+        self.encoded = encoded
+        self.path = path
+        self.future = PendingSnapshot(path)
+        self.created_at = time.time()
+
+
+def snapshot_path(cam_id, kind, label=None, now=None):
+    """Builds the sharded path for a snapshot: <base>/<YYYYMMDD>/cam<id>/<kind>_cam<id>[_label]_<time>.jpg"""
+    now = time.time() if now is None else now
+    base_dir = SNAPSHOT_DIRS.get(kind, os.path.join("data", "alerts", f"{kind}_alerts"))
+    label_part = f"_{label}" if label else ""
+    millis = int((now % 1) * 1000)
+    filename = f"{kind}_cam{cam_id}{label_part}_{time.strftime('%Y%m%d_%H%M%S', time.localtime(now))}_{millis:03d}.jpg"
+    return os.path.join(base_dir, time.strftime("%Y%m%d", time.localtime(now)), f"cam{cam_id}", filename)
+
+
+class SnapshotWriter:
+    """
+    Background JPEG writer so detectors never block on disk I/O.
+
+    Jobs carry either a frame (encoded here at ``quality``) or already encoded
+    bytes. The queue is bounded: when it is full, a new snapshot replaces the
+    frame of a still-queued job for the same camera and type (merge), otherwise
+    it is dropped and its future resolves to None immediately.
+
+    Frames are compared by dHash against the last ``dedup_history`` snapshots
+    of the same camera and type taken within ``dedup_seconds``; near-duplicates
+    are not written and get the future of the representative snapshot instead.
+
+    Written files are recorded in the snapshot catalogue, batched until the
+    queue runs empty.
+    """
+
+    def __init__(self, quality=JPEG_QUALITY, max_queue=QUEUE_SIZE,
+                 dedup_distance=DEDUP_DISTANCE, dedup_history=DEDUP_HISTORY,
+                 dedup_seconds=DEDUP_SECONDS, catalogue_path=CATALOGUE_PATH):
+        self.catalogue_path = catalogue_path
+        self.quality = quality
+        self.dedup_distance = dedup_distance
+        self.dedup_history = dedup_history
+        self.dedup_seconds = dedup_seconds
+        self.recent_hashes = {}  # key -> deque of (hash, future, added_at)
+        self.suppressed = 0
+        self.jobs = queue.Queue(maxsize=max_queue)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.merged = 0
+        self._known_dirs = set()
+        self._recent_paths = {}
+        self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, cam_id, kind, frame=None, encoded=None, label=None):
+        """
+        Queues a snapshot and returns a ``PendingSnapshot``.
+
+        The caller must not modify ``frame`` after submitting it.
+        """
+        key = (cam_id, kind)
+
+        frame_hash = None
+        if frame is not None and self.dedup_distance >= 0:
+            frame_hash = dhash(frame)
+            representative = self._find_duplicate(key, frame_hash)
+            if representative is not None:
+                self.suppressed += 1
+                return representative
+
+        path = snapshot_path(cam_id, kind, label)
+        last_path, repeats = self._recent_paths.get(key, (None, 0))
+        repeats = repeats + 1 if path == last_path else 0
+        self._recent_paths[key] = (path, repeats)
+        if repeats:
+            # Snapshots within the same millisecond must not overwrite each other
+            path = f"{path[:-4]}_{repeats}.jpg"
+        job = _SnapshotJob(key, frame, encoded, path)
+
+        with self.lock:
+            try:
+                self.jobs.put_nowait(job)
+                self.pending[key] = job
+                if frame_hash is not None:
+                    self._remember(key, frame_hash, job.future)
+                return job.future
+            except queue.Full:
+                queued = self.pending.get(key)
+                if queued is not None:
+                    # Keep the newest frame under the already reserved path
+                    queued.frame = frame
+                    queued.encoded = encoded
+                    self.merged += 1
+                    if frame_hash is not None:
+                        # The file will hold this frame, so later near-duplicates of it can share it too
+                        self._remember(key, frame_hash, queued.future)
+                    return queued.future
+
+        self.dropped += 1
+        print(f"[WARNING] Snapshot queue full, dropping {kind} snapshot for Camera {cam_id}.")
+        dropped = PendingSnapshot(None)
+        dropped.set_result(None)
+        return dropped
+
+    def _find_duplicate(self, key, frame_hash):
+        """Returns the future of a recent near-identical snapshot, dropping history older than ``dedup_seconds``."""
+        now = time.time()
+        with self.lock:
+            history = self.recent_hashes.get(key)
+            if not history:
+                return None
+            while history and now - history[0][2] > self.dedup_seconds:
+                history.popleft()
+            for stored_hash, representative, _ in history:
+                if representative.done() and representative.result() is None:
+                    continue  # Its write failed, so there is no file to share
+                if hamming(frame_hash, stored_hash) <= self.dedup_distance:
+                    return representative
+        return None
+
+    def _remember(self, key, frame_hash, future):
+        """Adds a hash to the dedup history; the caller holds ``self.lock``."""
+        history = self.recent_hashes.get(key)
+        if history is None:
+            history = self.recent_hashes[key] = deque(maxlen=self.dedup_history)
+        history.append((frame_hash, future, time.time()))
+
+    def close(self, timeout=5):
+        """Writes out everything already queued and stops the worker thread."""
+        self.jobs.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        catalogue = None
+        if self.catalogue_path:
+            try:
+                catalogue = SnapshotCatalogue(self.catalogue_path)
+            except Exception as e:
+                print(f"[ERROR] Snapshot catalogue unavailable, snapshots will not be indexed: {e}")
+        records = []
+
+        while True:
+            job = self.jobs.get()
+            if job is not None:
+                with self.lock:
+                    if self.pending.get(job.key) is job:
+                        del self.pending[job.key]
+                    frame, encoded = job.frame, job.encoded
+
+                size = self._write(job.path, frame, encoded)
+                if size:
+                    records.append((job.key[0], job.key[1], job.created_at, job.path, size))
+                job.future.set_result(job.path if size else None)
+
+            if records and catalogue is not None and (job is None or self.jobs.empty() or len(records) >= 50):
+                try:
+                    catalogue.add(records)
+                except Exception as e:
+                    print(f"[ERROR] Failed to index {len(records)} snapshots: {e}")
+                records = []
+
+            if job is None:
+                break
+
+    def _write(self, path, frame, encoded):
+        """Encodes and writes one snapshot, returning its size in bytes (0 on failure)."""
+        try:
+            if encoded is None:
+                ret, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ret:
+                    print(f"[ERROR] Failed to encode snapshot: {path}")
+                    return 0
+                encoded = buffer.tobytes()
+
+            directory = os.path.dirname(path)
+            if directory not in self._known_dirs:
+                os.makedirs(directory, exist_ok=True)
+                self._known_dirs.add(directory)
+
+            # Write to a temporary name first so readers never see a partial JPEG
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+            return len(encoded)
+        except Exception as e:
+            print(f"[ERROR] Failed to write snapshot {path}: {e}")
+            return 0
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_snapshot_writer():
+    """Returns the snapshot writer of the current process, starting it on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = SnapshotWriter()
+        return _writer
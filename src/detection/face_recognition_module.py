@@ -128,6 +128,8 @@ import pickle
 import numpy as np
 import time
 from multiprocessing import shared_memory
+from ..core.snapshot_writer import get_snapshot_writer
+from ..core.event_bus import publish
 
 # Global variables for encodings
 known_encodings = []
@@ -219,7 +221,7 @@ def face_recognition_process(shm_name, shape, output_queue, cam_id):
                 image_path = save_face_frame(frame, cam_id, name)
                 for face in detected_faces:
                     face["image_path"] = image_path
-                output_queue.put(detected_faces)
+                publish(output_queue, "face", cam_id, detected_faces)
 
     except Exception as e:
         print(f"[ERROR] Face recognition process encountered an issue: {str(e)}")
@@ -228,24 +230,7 @@ def face_recognition_process(shm_name, shape, output_queue, cam_id):
         print(f"[INFO] Face recognition shutting down for Camera {cam_id}...")
         shared_mem.close()
 
-# 🔹 Save Face Detection Image
+# 🔹 Queue Face Detection Image for the snapshot writer
 def save_face_frame(frame, cam_id, label):
-    # Create the correct directory structure
-    face_dir = os.path.join("data", "alerts", "face_alerts")
-    os.makedirs(face_dir, exist_ok=True)
-    
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    filename = f"face_cam{cam_id}_{label}_{timestamp}.jpg"
-    image_path = os.path.join(face_dir, filename)
-
-    try:
-        cv2.imwrite(image_path, frame)
-        if os.path.exists(image_path) and os.path.getsize(image_path) > 0:
-            print(f"[INFO] Face detection frame saved: {image_path}")
-            return image_path
-        else:
-            print(f"[ERROR] Failed to save face image for Camera {cam_id}.")
-            return None
-    except Exception as e:
-        print(f"[ERROR] Exception while saving face frame for Camera {cam_id}: {e}")
-        return None
+    """Hands the annotated frame to the background writer and returns its reserved path (None if dropped)."""
+    return get_snapshot_writer().submit(cam_id, "face", frame=frame, label=label).path
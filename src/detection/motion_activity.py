@@ -0,0 +1,114 @@
+import os
+import time
+import numpy as np
+import cv2
+
+ACTIVITY_DIR = os.path.join("data", "analytics", "motion")
+MINUTES_PER_DAY = 24 * 60
+
+
+def _camera_dir(cam_id, base_dir=ACTIVITY_DIR):
+    return os.path.join(base_dir, f"cam{cam_id}")
+
+
+def _atomic_save(path, array):
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class MotionActivityRecorder:
+    """
+    Keeps a decayed motion heatmap and a per-minute activity series for one camera.
+
+    The heatmap is a float32 accumulator at analysis resolution updated with
+    ``cv2.accumulateWeighted``. Activity is summed per minute of the day
+    alongside the number of analysed frames, so the mean can be derived later.
+    Both are flushed to ``data/analytics/motion/cam<id>/`` every ``flush_interval``
+    seconds and whenever the day rolls over.
+    """
+
+    def __init__(self, cam_id, size, decay=0.01, flush_interval=60, base_dir=ACTIVITY_DIR):
+        self.cam_id = cam_id
+        self.decay = decay
+        self.flush_interval = flush_interval
+        self.directory = _camera_dir(cam_id, base_dir)
+        os.makedirs(self.directory, exist_ok=True)
+
+        width, height = size
+        self.heatmap = np.zeros((height, width), dtype=np.float32)
+        heatmap_path = os.path.join(self.directory, "heatmap.npy")
+        if os.path.exists(heatmap_path):
+            try:
+                saved = np.load(heatmap_path).astype(np.float32)
+                if saved.shape == self.heatmap.shape:
+                    self.heatmap = saved
+            except Exception as e:
+                print(f"[WARNING] Camera {cam_id}: Could not load saved heatmap: {e}")
+
+        self.day = None
+        self.activity = None
+        self._last_flush = time.time()
+
+    def _activity_path(self, day):
+        return os.path.join(self.directory, f"activity_{day}.npy")
+
+    def _load_day(self, day):
+        """Starts counting for a day, continuing from an earlier flush if one exists."""
+        self.day = day
+        path = self._activity_path(day)
+        if os.path.exists(path):
+            try:
+                self.activity = np.load(path).astype(np.float32)
+                return
+            except Exception as e:
+                print(f"[WARNING] Camera {self.cam_id}: Could not load activity for {day}: {e}")
+        # Column 0: summed activity ratio, column 1: analysed frames
+        self.activity = np.zeros((MINUTES_PER_DAY, 2), dtype=np.float32)
+
+    def update(self, mask, activity, now=None):
+        """Adds one analysed frame. ``mask`` is the cleaned binary motion mask."""
+        now = time.time() if now is None else now
+        local = time.localtime(now)
+        day = time.strftime("%Y%m%d", local)
+        if day != self.day:
+            if self.day is not None:
+                self.flush()
+            self._load_day(day)
+
+        cv2.accumulateWeighted(mask, self.heatmap, self.decay)
+        minute = local.tm_hour * 60 + local.tm_min
+        self.activity[minute, 0] += activity
+        self.activity[minute, 1] += 1
+
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+    def flush(self):
+        try:
+            _atomic_save(os.path.join(self.directory, "heatmap.npy"), self.heatmap.astype(np.float16))
+            if self.day is not None:
+                _atomic_save(self._activity_path(self.day), self.activity)
+        except Exception as e:
+            print(f"[ERROR] Camera {self.cam_id}: Failed to flush motion activity: {e}")
+
+
+def load_heatmap(cam_id, base_dir=ACTIVITY_DIR):
+    """Returns the last flushed heatmap for a camera normalised to 0..1, or None."""
+    path = os.path.join(_camera_dir(cam_id, base_dir), "heatmap.npy")
+    if not os.path.exists(path):
+        return None
+    heatmap = np.load(path).astype(np.float32)
+    peak = float(heatmap.max())
+    return heatmap / peak if peak > 0 else heatmap
+
+
+def load_activity(cam_id, day, base_dir=ACTIVITY_DIR):
+    """Returns the mean activity ratio for each minute of ``day`` (``YYYYMMDD``), or None."""
+    path = os.path.join(_camera_dir(cam_id, base_dir), f"activity_{day}.npy")
+    if not os.path.exists(path):
+        return None
+    activity = np.load(path)
+    return np.divide(activity[:, 0], activity[:, 1], out=np.zeros(MINUTES_PER_DAY, dtype=np.float32),
+                     where=activity[:, 1] > 0)
@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+
+# Full-frame size of the cells compared by the block-mean backend
+BLOCK_SIZE = 16
+# Averaging over a cell dampens changes, so the per-pixel threshold is scaled down
+BLOCK_THRESHOLD_DIVISOR = 4
+
+
+class MOG2Backend:
+    """Gaussian mixture background model; the most robust and the most expensive option."""
+
+    name = "mog2"
+
+    def __init__(self, size, threshold, scale=1):
+        self.subtractor = cv2.createBackgroundSubtractorMOG2(history=50, varThreshold=threshold, detectShadows=True)
+
+    def apply(self, gray):
+        return self.subtractor.apply(gray)
+
+
+class RunningAverageBackend:
+    """Absolute difference against an exponentially weighted running average of the plane."""
+
+    name = "running_average"
+
+    def __init__(self, size, threshold, scale=1, alpha=0.05):
+        self.threshold = threshold
+        self.alpha = alpha
+        self.background = None
+        self.diff = np.zeros((size[1], size[0]), dtype=np.uint8)
+
+    def apply(self, gray):
+        if self.background is None:
+            self.background = gray.astype(np.float32)
+        cv2.absdiff(gray, cv2.convertScaleAbs(self.background), dst=self.diff)
+        cv2.accumulateWeighted(gray, self.background, self.alpha)
+        _, mask = cv2.threshold(self.diff, self.threshold, 255, cv2.THRESH_BINARY)
+        return mask
+
+
+class BlockDiffBackend:
+    """Compares per-cell means on a BLOCK_SIZE grid between consecutive frames."""
+
+    name = "block_diff"
+
+    def __init__(self, size, threshold, scale=1):
+        self.threshold = max(1, threshold // BLOCK_THRESHOLD_DIVISOR)
+        self.size = size
+        cell = max(1, BLOCK_SIZE // scale)
+        self.grid = (max(1, size[0] // cell), max(1, size[1] // cell))
+        self.previous = None
+
+    def apply(self, gray):
+        means = cv2.resize(gray, self.grid, interpolation=cv2.INTER_AREA)
+        if self.previous is None:
+            self.previous = means
+        diff = cv2.absdiff(means, self.previous)
+        self.previous = means
+        _, cells = cv2.threshold(diff, self.threshold, 255, cv2.THRESH_BINARY)
+        return cv2.resize(cells, self.size, interpolation=cv2.INTER_NEAREST)
+
+
+MOTION_BACKENDS = {
+    MOG2Backend.name: MOG2Backend,
+    RunningAverageBackend.name: RunningAverageBackend,
+    BlockDiffBackend.name: BlockDiffBackend,
+}
+
+
+def create_motion_backend(name, size, threshold, scale=1):
+    """
+    Creates the motion backend for a camera.
+
+    Every backend takes a grayscale plane at analysis resolution and returns a
+    uint8 foreground mask of the same size (255 = motion), so the cleanup and
+    blob extraction in ``analyse_motion`` is shared. Unknown names fall back to MOG2.
+    """
+    backend_cls = MOTION_BACKENDS.get(name or MOG2Backend.name)
+    if backend_cls is None:
+        print(f"[WARNING] Unknown motion backend '{name}', falling back to {MOG2Backend.name}.")
+        backend_cls = MOG2Backend
+    return backend_cls(size, threshold, scale)
@@ -3,13 +3,165 @@ import numpy as np
 from multiprocessing import shared_memory
 import os
 import time
+from .motion_activity import MotionActivityRecorder
+from .motion_backends import create_motion_backend
+from ..core.snapshot_writer import get_snapshot_writer
+from ..core.event_bus import publish
 
-def motion_detection_process(shm_name, shape, motion_queue, cam_id,varThreshold):
+# MOG2 marks shadows with 127 and foreground with 255; anything below this is dropped.
+SHADOW_CUTOFF = 200
+MORPH_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+# Camera settings that need the background model rebuilt; the minimum area only filters blobs
+MOTION_MODEL_SETTINGS = ("motionThreshold", "motionScale", "motionZones", "motionBackend")
+
+# Rasterised zone masks per camera: cam_id -> (signature, zone_masks)
+_zone_mask_cache = {}
+
+
+def build_zone_masks(zones, size):
+    """
+    Rasterises include/exclude polygons into uint8 masks at analysis resolution.
+
+    Args:
+        zones (dict): ``{"include": [...], "exclude": [...]}`` where each zone is
+            ``{"name": str, "points": [[x, y], ...]}`` with coordinates normalised
+            to 0..1 of the frame width/height.
+        size (tuple): Analysis size as ``(width, height)``.
+
+    Returns:
+        dict: ``combined`` (the monitored area), ``zones`` as a list of
+        ``(name, mask, area)`` for every include zone, and ``area`` of the
+        combined mask in pixels.
+    """
+    width, height = size
+    zones = zones or {}
+
+    def rasterise(points):
+        mask = np.zeros((height, width), dtype=np.uint8)
+        pts = np.array([[x * width, y * height] for x, y in points], dtype=np.int32)
+        if len(pts) >= 3:
+            cv2.fillPoly(mask, [pts], 255)
+        return mask
+
+    include = []
+    for i, zone in enumerate(zones.get("include") or []):
+        mask = rasterise(zone.get("points", []))
+        include.append((zone.get("name") or f"zone{i + 1}", mask))
+
+    if include:
+        combined = np.zeros((height, width), dtype=np.uint8)
+        for _, mask in include:
+            cv2.bitwise_or(combined, mask, dst=combined)
+    else:
+        combined = np.full((height, width), 255, dtype=np.uint8)
+
+    exclude = np.zeros((height, width), dtype=np.uint8)
+    for zone in zones.get("exclude") or []:
+        cv2.bitwise_or(exclude, rasterise(zone.get("points", [])), dst=exclude)
+    cv2.bitwise_and(combined, cv2.bitwise_not(exclude), dst=combined)
+
+    # Excluded areas are removed from every include zone as well
+    zone_masks = []
+    for name, mask in include:
+        cv2.bitwise_and(mask, combined, dst=mask)
+        zone_masks.append((name, mask, cv2.countNonZero(mask)))
+
+    return {"combined": combined, "zones": zone_masks, "area": cv2.countNonZero(combined)}
+
+
+def get_zone_masks(cam_id, zones, size):
+    """Returns the cached zone masks for a camera, rebuilding them only when the zones change."""
+    signature = (repr(zones), tuple(size))
+    cached = _zone_mask_cache.get(cam_id)
+    if cached is None or cached[0] != signature:
+        cached = (signature, build_zone_masks(zones, size))
+        _zone_mask_cache[cam_id] = cached
+    return cached[1]
+
+
+def analyse_motion(fg_mask, scale, min_area, zone_masks=None):
+    """
+    Cleans a low-resolution foreground mask and extracts motion blobs.
+
+    Args:
+        fg_mask (ndarray): Raw MOG2 mask at analysis resolution.
+        scale (int): Downscale factor between the full frame and the mask.
+        min_area (int): Minimum blob area in full-frame pixels.
+        zone_masks (dict): Optional masks from ``build_zone_masks``; motion
+            outside the monitored area is ignored.
+
+    Returns:
+        dict: ``activity`` (foreground ratio of the monitored area, shadows
+        excluded), ``blobs`` as ``(x1, y1, x2, y2)`` boxes in full-frame
+        coordinates, per-zone activity in ``zones`` and the cleaned binary ``mask``.
+    """
+    _, mask = cv2.threshold(fg_mask, SHADOW_CUTOFF, 255, cv2.THRESH_BINARY)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, MORPH_KERNEL)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, MORPH_KERNEL)
+
+    zone_scores = {}
+    if zone_masks is not None:
+        cv2.bitwise_and(mask, zone_masks["combined"], dst=mask)
+        activity = cv2.countNonZero(mask) / float(max(zone_masks["area"], 1))
+        for name, zone_mask, area in zone_masks["zones"]:
+            zone_scores[name] = cv2.countNonZero(cv2.bitwise_and(mask, zone_mask)) / float(max(area, 1))
+    else:
+        activity = cv2.countNonZero(mask) / float(mask.size)
+
+    blobs = []
+    min_area_small = min_area / float(scale * scale)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        if cv2.contourArea(contour) < min_area_small:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        blobs.append((x * scale, y * scale, (x + w) * scale, (y + h) * scale))
+
+    return {"activity": activity, "blobs": blobs, "zones": zone_scores, "mask": mask}
+
+
+def motion_detection_process(shm_name, shape, motion_queue, cam_id, varThreshold, scale=4, min_area=200, zones=None,
+                             backend="mog2", config=None):
+    """
+    Publishes "motion" events for the camera in ``shm_name``.
+
+    ``config`` is an optional ConfigReader for this camera; threshold, scale,
+    minimum area, zones and backend changes are applied without a restart.
+    Changes to other settings (object threshold, camera name) leave the
+    background model alone.
+    """
     shared_mem = shared_memory.SharedMemory(name=shm_name)
     frame_buffer = np.ndarray(shape, dtype=np.uint8, buffer=shared_mem.buf)
-    bg_subtractor = cv2.createBackgroundSubtractorMOG2(history=50, varThreshold=varThreshold)
-    
+
+    def setup(varThreshold, scale, zones, backend):
+        scale = max(1, int(scale or 1))
+        analysis_size = (shape[1] // scale, shape[0] // scale)
+        motion_backend = create_motion_backend(backend, analysis_size, varThreshold, scale)
+        zone_masks = get_zone_masks(cam_id, zones, analysis_size) if zones else None
+        return scale, analysis_size, motion_backend, zone_masks
+
+    scale, analysis_size, motion_backend, zone_masks = setup(varThreshold, scale, zones, backend)
+    print(f"[INFO] Motion detection ({motion_backend.name}) started for Camera {cam_id} at {analysis_size[0]}x{analysis_size[1]}...")
+    activity_recorder = MotionActivityRecorder(cam_id, analysis_size)
+    current = config.current if config is not None else None
+    model_settings = {key: current.get(key) for key in MOTION_MODEL_SETTINGS} if current else None
+
     while True:
+        changed = config.poll() if config is not None else None
+        if changed:
+            min_area = changed.get('motionMinArea', 200)
+            new_model_settings = {key: changed.get(key) for key in MOTION_MODEL_SETTINGS}
+            if new_model_settings != model_settings:
+                # The background model restarts, which takes a few frames to settle
+                model_settings = new_model_settings
+                scale, new_size, motion_backend, zone_masks = setup(changed.get('motionThreshold'), changed.get('motionScale', 4),
+                                                                    changed.get('motionZones'), changed.get('motionBackend', 'mog2'))
+                if new_size != analysis_size:
+                    activity_recorder.flush()
+                    activity_recorder = MotionActivityRecorder(cam_id, new_size)
+                    analysis_size = new_size
+                print(f"[INFO] Camera {cam_id}: motion settings reloaded ({motion_backend.name}, threshold {changed.get('motionThreshold')})")
+
         frame = frame_buffer.copy()
 
         # ✅ Ensure the frame is valid before processing
@@ -18,47 +170,42 @@ def motion_detection_process(shm_name, shape, motion_queue, cam_id,varThreshold)
             continue
 
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        fg_mask = bg_subtractor.apply(gray)
-        motion_score = cv2.countNonZero(fg_mask)
+        small = cv2.resize(gray, analysis_size, interpolation=cv2.INTER_AREA)
+        fg_mask = motion_backend.apply(small)
+        result = analyse_motion(fg_mask, scale, min_area, zone_masks)
+        activity_recorder.update(result["mask"], result["activity"])
+        blobs = result["blobs"]
 
-        if motion_score > 100:  # Adjust threshold if needed
+        if blobs:
             image_path = save_motion_frame(frame, cam_id)
-            
+
+            message = f"Motion detected in {len(blobs)} region(s), activity {result['activity']:.1%}"
+            active_zones = [name for name, score in result["zones"].items() if score > 0]
+            if active_zones:
+                message += f" (zones: {', '.join(active_zones)})"
+
             # Send alert regardless of image save status, but include image path if available
             alert_data = {
                 "cam_id": cam_id,
-                "message": f"Motion detected with score {motion_score}",
+                "message": message,
                 "severity": "medium",
                 "detection_type": "motion",
+                "activity": result["activity"],
+                "blobs": blobs,
+                "zones": result["zones"],
                 "image_path": image_path  # This could be None if image save failed
             }
-            motion_queue.put(alert_data)
-            
+            publish(motion_queue, "motion", cam_id, alert_data)
+
             if not image_path:
-                print(f"[WARNING] Camera {cam_id}: Motion detected but failed to save frame.")
+                print(f"[WARNING] Camera {cam_id}: Motion detected but snapshot was dropped.")
             else:
-                print(f"[INFO] Camera {cam_id}: Motion detected and frame saved successfully.")
+                print(f"[INFO] Camera {cam_id}: Motion detected, snapshot queued: {image_path}")
 
-# 🔹 Save Motion Frame with Timestamp and Folder
+# 🔹 Queue Motion Frame for the snapshot writer
 def save_motion_frame(frame, cam_id):
-    # Create the correct directory structure
-    motion_dir = os.path.join("data", "alerts", "motion_alerts")
-    os.makedirs(motion_dir, exist_ok=True)
-    
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    image_path = os.path.join(motion_dir, f"motion_cam{cam_id}_{timestamp}.jpg")
-    
-    try:
-        cv2.imwrite(image_path, frame)
-        if os.path.exists(image_path) and os.path.getsize(image_path) > 0:
-            print(f"[INFO] Motion frame saved: {image_path}")
-            return image_path
-        else:
-            print(f"[ERROR] Failed to save motion image for Camera {cam_id}.")
-            return None
-    except Exception as e:
-        print(f"[ERROR] Exception while saving motion frame for Camera {cam_id}: {e}")
-        return None
+    """Hands the frame to the background writer and returns its reserved path (None if dropped)."""
+    return get_snapshot_writer().submit(cam_id, "motion", frame=frame).path
 
 if __name__ == "__main__":
     print("Run main.py to start the system.")
@@ -112,15 +112,19 @@ from multiprocessing import shared_memory
 import numpy as np
 import time
 import os
+from ..core.snapshot_writer import get_snapshot_writer
+from ..core.event_bus import publish
 
-def object_detection_process(shm_name, shape, output_queue, cam_id,objectThreshold):
+def object_detection_process(shm_name, shape, output_queue, cam_id,objectThreshold, config=None):
     """
     Continuously reads frames from shared memory, runs YOLO object detection,
-    and outputs detections via the output_queue. Also draws bounding boxes and
-    saves the processed frame with object label in filename.
+    and publishes detections as "object" events on output_queue. Also draws bounding boxes and
+    queues one annotated snapshot per frame with the object labels in its filename.
+    ``config`` is an optional ConfigReader; a new objectThreshold applies from the next frame.
     """
     shm = shared_memory.SharedMemory(name=shm_name)
     frame_buffer = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    snapshot_writer = get_snapshot_writer()
 
     model = YOLO('../../data/models/best.pt')
     #model = YOLO("yolo11m.pt")
@@ -128,19 +132,20 @@ def object_detection_process(shm_name, shape, output_queue, cam_id,objectThresho
     while True:
         time.sleep(0.01)
 
+        changed = config.poll() if config is not None else None
+        # Other settings of this camera change too; only a new threshold concerns the detector
+        if changed and changed.get('objectThreshold', objectThreshold) != objectThreshold:
+            objectThreshold = changed.get('objectThreshold', objectThreshold)
+            print(f"[INFO] Camera {cam_id}: object threshold reloaded ({objectThreshold})")
+
         frame = np.copy(frame_buffer)
 
         if frame is None or frame.shape != shape or np.all(frame == 0):
             print(f"[ERROR] Camera {cam_id}: Invalid or empty frame. Saving for inspection...")
 
-            os.makedirs("invalid_frames", exist_ok=True)
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            invalid_path = os.path.join("invalid_frames", f"invalid_cam{cam_id}_{timestamp}.jpg")
-            try:
-                cv2.imwrite(invalid_path, frame)
-                print(f"[INFO] Invalid frame saved to: {invalid_path}")
-            except Exception as e:
-                print(f"[ERROR] Failed to save invalid frame: {e}")
+            if frame is not None and frame.size > 0:
+                invalid_path = snapshot_writer.submit(cam_id, "invalid", frame=frame).path
+                print(f"[INFO] Invalid frame queued: {invalid_path}")
             continue
 
         print(f"[DEBUG] Camera {cam_id}: Frame mean pixel value: {frame.mean():.2f}")
@@ -186,19 +191,11 @@ def object_detection_process(shm_name, shape, output_queue, cam_id,objectThresho
                 cv2.putText(frame, f"{label}: {confidence:.2f}", (x1, y1 - 10),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
 
-                # 🔻 Save frame with label in filename
-                os.makedirs("objects_detected", exist_ok=True)
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                filename = f"detected_cam{cam_id}_{label}_{timestamp}.jpg"
-                filepath = os.path.join("objects_detected", filename)
-                try:
-                    cv2.imwrite(filepath, frame)
-                    print(f"[INFO] Saved detected object: {filepath}")
-                except Exception as e:
-                    print(f"[ERROR] Failed to save detection image: {e}")
-
         if detected_objects:
-            output_queue.put({"cam_id": cam_id, "detections": detected_objects})
+            # 🔻 Queue one snapshot with every box drawn, labels in the filename
+            labels = "-".join(sorted({obj["label"] for obj in detected_objects}))
+            image_path = snapshot_writer.submit(cam_id, "object", frame=frame, label=labels).path
+            publish(output_queue, "object", cam_id, {"cam_id": cam_id, "detections": detected_objects, "image_path": image_path})
 
 if __name__ == "__main__":
     print("Run main.py to start the system.")
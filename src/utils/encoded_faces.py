@@ -1,9 +1,13 @@
 import os
-import pickle
 from imutils import paths
 import cv2
 import face_recognition
 
+try:
+    from .gallery_meta import save_encodings
+except ImportError:
+    from gallery_meta import save_encodings
+
 def encode_faces(dataset_dir="dataset", encodings_file="encodings.pickle"):
     print("[INFO] Quantifying faces...")
     image_paths = list(paths.list_images(dataset_dir))
@@ -31,8 +35,7 @@ def encode_faces(dataset_dir="dataset", encodings_file="encodings.pickle"):
 
     # Save encodings to disk
     data = {"encodings": known_encodings, "names": known_names}
-    with open(encodings_file, "wb") as f:
-        pickle.dump(data, f)
+    save_encodings(encodings_file, data)
 
     print("[INFO] Encodings serialized to disk.")
 
@@ -0,0 +1,99 @@
+import json
+import os
+import pickle
+import threading
+from datetime import datetime
+
+# 🔹 Gallery metadata: a small JSON sidecar next to encodings.pickle, so readers
+# that only need counts never unpickle the whole gallery.
+
+_cache = {}  # sidecar path -> (mtime_ns, metadata)
+_cache_lock = threading.Lock()
+
+
+def meta_path(encodings_file):
+    """``config/encodings.pickle`` -> ``config/encodings.meta.json``"""
+    return os.path.splitext(encodings_file)[0] + ".meta.json"
+
+
+def _write_atomic(path, data, mode):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode) as f:
+        if "b" in mode:
+            pickle.dump(data, f)
+        else:
+            json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _read_meta(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_gallery_meta(encodings_file, names):
+    """Writes the sidecar for a gallery holding one encoding per entry of ``names``."""
+    path = meta_path(encodings_file)
+    previous = _read_meta(path) or {}
+    meta = {
+        "count": len(names),
+        "identities": len(set(names)),
+        "version": previous.get("version", 0) + 1,
+        "updated": datetime.now().isoformat(timespec="seconds"),
+    }
+    _write_atomic(path, meta, "w")
+    return meta
+
+
+def save_encodings(encodings_file, data):
+    """
+    Saves the gallery and then its sidecar.
+
+    Both are written to a temporary file and renamed into place, so readers
+    never see a half-written pickle.
+    """
+    os.makedirs(os.path.dirname(encodings_file) or ".", exist_ok=True)
+    _write_atomic(encodings_file, data, "wb")
+    return write_gallery_meta(encodings_file, data.get("names", []))
+
+
+def gallery_meta(encodings_file):
+    """
+    Returns ``{"count", "identities", "version", "updated"}`` for a gallery.
+
+    The sidecar is parsed once per modification and cached by its mtime. A
+    gallery without a sidecar, or with one older than the pickle (written by
+    an older tool), has it rebuilt from the pickle once. A missing gallery
+    counts as empty.
+    """
+    path = meta_path(encodings_file)
+    try:
+        pickle_mtime = os.stat(encodings_file).st_mtime_ns
+    except OSError:
+        return {"count": 0, "identities": 0, "version": 0, "updated": None}
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+
+    if mtime is None or mtime < pickle_mtime:
+        try:
+            with open(encodings_file, "rb") as f:
+                data = pickle.load(f)
+            write_gallery_meta(encodings_file, data.get("names", []))
+            mtime = os.stat(path).st_mtime_ns
+        except Exception as e:
+            print(f"[ERROR] Failed to rebuild gallery metadata for {encodings_file}: {e}")
+            return {"count": 0, "identities": 0, "version": 0, "updated": None}
+
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    meta = _read_meta(path) or {"count": 0, "identities": 0, "version": 0, "updated": None}
+    with _cache_lock:
+        _cache[path] = (mtime, meta)
+    return meta
@@ -2,7 +2,7 @@
 # IMPORTS
 # ================================================================
 
-from flask import Flask, render_template, Response, jsonify, request, redirect, url_for, flash
+from flask import Flask, render_template, Response, jsonify, request, redirect, url_for, flash, send_file, stream_with_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -29,6 +29,7 @@ import subprocess
 from flask import flash, redirect, url_for
 import psutil
 import signal
+import sys
 import time
 # ================================================================
 # APPLICATION CONFIGURATION
@@ -36,6 +37,35 @@ import time
 from dotenv import load_dotenv
 import os
 
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+# This file is run directly as well as imported from src.core, so fall back to
+# absolute imports when there is no parent package.
+try:
+    from ..detection.motion_activity import load_heatmap, load_activity
+    from ..core.snapshot_catalogue import SnapshotCatalogue
+    from ..core.segment_recorder import RecordingIndex
+    from ..core.frame_grabber import FRAME_SHAPE
+    from ..utils.gallery_meta import gallery_meta, save_encodings
+    from .thumbnails import ThumbnailCache
+    from .ttl_cache import TTLCache
+except ImportError:
+    sys.path.insert(0, PROJECT_ROOT)
+    from src.detection.motion_activity import load_heatmap, load_activity
+    from src.core.snapshot_catalogue import SnapshotCatalogue
+    from src.core.segment_recorder import RecordingIndex
+    from src.core.frame_grabber import FRAME_SHAPE
+    from src.utils.gallery_meta import gallery_meta, save_encodings
+    from src.web.thumbnails import ThumbnailCache
+    from src.web.ttl_cache import TTLCache
+
+MOTION_ACTIVITY_DIR = os.path.join(PROJECT_ROOT, 'data', 'analytics', 'motion')
+SNAPSHOT_CATALOGUE_PATH = os.path.join(PROJECT_ROOT, 'data', 'snapshots', 'catalogue.db')
+RECORDING_INDEX_PATH = os.path.join(PROJECT_ROOT, 'data', 'recordings', 'index.db')
+thumbnail_cache = ThumbnailCache(os.path.join(PROJECT_ROOT, 'data', 'thumbnails'))
+STATS_CACHE_SECONDS = float(os.getenv("STATS_CACHE_SECONDS", 5))
+stats_cache = TTLCache(STATS_CACHE_SECONDS)  # Dashboard and /api/alerts/stats counters
+
 # Global variable to track system state
 system_process = None
 system_running = False
@@ -76,6 +106,9 @@ mail = Mail(app)
 # Email notification settings
 ENABLE_EMAIL_NOTIFICATIONS = os.getenv('ENABLE_EMAIL_NOTIFICATIONS', 'True').lower() == 'true'
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', 'admin@yourdomain.com')
+# Default delivery policy: these severities are emailed at once, the rest go into a periodic digest
+NOTIFY_IMMEDIATE_SEVERITIES = [s.strip() for s in os.getenv('NOTIFY_IMMEDIATE_SEVERITIES', 'high').split(',') if s.strip()]
+DIGEST_MINUTES = int(os.getenv('DIGEST_MINUTES', 15))
 
 print(f"[EMAIL CONFIG] Email notifications: {'ENABLED' if ENABLE_EMAIL_NOTIFICATIONS else 'DISABLED'}")
 print(f"[EMAIL CONFIG] Admin email: {ADMIN_EMAIL}")
@@ -107,6 +140,10 @@ class User(UserMixin, db.Model):
     role = db.Column(db.String(20), nullable=False, default='moderator')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    notify_immediate = db.Column(db.JSON, nullable=True)  # Severities emailed at once; None uses NOTIFY_IMMEDIATE_SEVERITIES
+    digest_minutes = db.Column(db.Integer, nullable=True)  # Digest interval for other severities; None uses DIGEST_MINUTES, 0 disables
+    digest_watermark = db.Column(db.Integer, nullable=False, default=0)  # Last alert id covered by a digest
+    digest_sent_at = db.Column(db.DateTime)
 
 
     def set_password(self, password):
@@ -125,6 +162,14 @@ class User(UserMixin, db.Model):
         """Check if user is moderator or admin"""
         return self.role in ['admin', 'moderator']
 
+    def immediate_severities(self):
+        """Severities this user is emailed about as soon as an incident closes"""
+        return NOTIFY_IMMEDIATE_SEVERITIES if self.notify_immediate is None else self.notify_immediate
+
+    def digest_interval(self):
+        """Minutes between digests of the remaining severities (0 means no digest)"""
+        return DIGEST_MINUTES if self.digest_minutes is None else self.digest_minutes
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -134,16 +179,68 @@ from flask import jsonify, request
 
 # Updated Alert Model
 class Alert(db.Model):
+    # Indexes for the /api/alerts filters; the ones ending in id also serve its keyset paging
+    __table_args__ = (
+        db.Index('ix_alert_status_id', 'status', 'id'),
+        db.Index('ix_alert_severity_id', 'severity', 'id'),
+        db.Index('ix_alert_camera_created_at', 'camera', 'created_at'),
+        db.Index('ix_alert_is_true_detection', 'is_true_detection'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     camera = db.Column(db.String(50))
+    camera_id = db.Column(db.Integer, db.ForeignKey('camera_settings.id', name='fk_alert_camera_id', ondelete='SET NULL'), nullable=True)
     location = db.Column(db.String(100))
-    time = db.Column(db.String(100))
+    time = db.Column(db.String(100))  # Display copy of created_at ("%Y-%m-%d %H:%M:%S")
+    created_at = db.Column(db.DateTime, default=datetime.now)  # Local time, like the time string
     message = db.Column(db.String(200))
     severity = db.Column(db.String(20))
     status = db.Column(db.String(20), default='New')  # New, Acknowledged, Resolved
     is_true_detection = db.Column(db.Boolean, default=None)  # True, False, or None (unreviewed)
     reviewed_by = db.Column(db.String(50))
     reviewed_at = db.Column(db.DateTime)
+    image_path = db.Column(db.String(255))  # Snapshot taken for the alert
+    clip_path = db.Column(db.String(255))  # Pre/post-event clip, attached once encoded
+
+
+class AlertRollup(db.Model):
+    """Alert counts per hour and per day for each camera, type (location) and severity, kept up to date as alerts are stored."""
+    __tablename__ = 'alert_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('period', 'bucket', 'camera', 'location', 'severity', name='uq_alert_rollups_key'),
+        db.Index('ix_alert_rollups_period_bucket', 'period', 'bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    period = db.Column(db.String(4), nullable=False)  # hour or day
+    bucket = db.Column(db.DateTime, nullable=False)  # Start of the hour/day, local time like Alert.time
+    camera = db.Column(db.String(50), nullable=False, default='')
+    location = db.Column(db.String(100), nullable=False, default='')
+    severity = db.Column(db.String(20), nullable=False, default='')
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class NotificationOutbox(db.Model):
+    """Pending notifications, written in the same transaction as their alert and drained by the dispatcher."""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (db.Index('ix_notification_outbox_status_next', 'status', 'next_attempt_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    alert_id = db.Column(db.Integer, db.ForeignKey('alert.id'), nullable=True)
+    channel = db.Column(db.String(20), nullable=False, default='email')
+    recipient = db.Column(db.String(120), nullable=True)  # None means every active user whose policy covers the severity
+    severity = db.Column(db.String(20), nullable=True)
+    subject = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    attachment_path = db.Column(db.String(255))
+    status = db.Column(db.String(20), nullable=False, default='pending')  # held, pending, sending, delivered, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claim_token = db.Column(db.String(36))
+    claimed_at = db.Column(db.DateTime)
+    last_error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime)
 
 
 class CameraSetting(db.Model):
@@ -154,16 +251,51 @@ class CameraSetting(db.Model):
     detections = db.Column(db.JSON, nullable=False)
     object_threshold = db.Column(db.Float, nullable=False, default=0.5)
     motion_threshold = db.Column(db.Integer, nullable=False, default=30)
+    motion_scale = db.Column(db.Integer, nullable=False, default=4)  # Downscale factor for motion analysis
+    motion_min_area = db.Column(db.Integer, nullable=False, default=200)  # Minimum blob area in full-frame pixels
+    motion_zones = db.Column(db.JSON, nullable=True)  # {"include": [...], "exclude": [...]} polygons, normalised 0..1
+    motion_backend = db.Column(db.String(20), nullable=False, default='mog2')  # mog2, running_average or block_diff
+    continuous_recording = db.Column(db.Boolean, nullable=False, default=False)  # Record fixed-length segments 24/7
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # API (camelCase) field -> column attribute
+    API_FIELDS = {
+        'detections': 'detections',
+        'objectThreshold': 'object_threshold',
+        'motionThreshold': 'motion_threshold',
+        'motionScale': 'motion_scale',
+        'motionMinArea': 'motion_min_area',
+        'motionZones': 'motion_zones',
+        'motionBackend': 'motion_backend',
+        'continuousRecording': 'continuous_recording',
+    }
+
+    def apply_dict(self, data):
+        """Copy the API fields present in data onto the row; returns True if anything changed"""
+        changed = False
+        for key, attribute in self.API_FIELDS.items():
+            if key not in data:
+                continue
+            value = bool(data[key]) if key == 'continuousRecording' else data[key]
+            if getattr(self, attribute) != value:
+                setattr(self, attribute, value)
+                changed = True
+        return changed
+
     def to_dict(self):
         """Convert model to dictionary for JSON serialization"""
         return {
+            'id': self.id,
             'source': self.source,
             'detections': self.detections,
             'objectThreshold': self.object_threshold,
-            'motionThreshold': self.motion_threshold
+            'motionThreshold': self.motion_threshold,
+            'motionScale': self.motion_scale,
+            'motionMinArea': self.motion_min_area,
+            'motionZones': self.motion_zones,
+            'motionBackend': self.motion_backend,
+            'continuousRecording': self.continuous_recording
         }
 
     def __repr__(self):
@@ -209,7 +341,6 @@ def moderator_required(f):
 # UTILITY FUNCTIONS
 # ================================================================
 
-FRAME_SHAPE = (240, 320, 3)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
 
 def save_system_pid(pid):
@@ -344,7 +475,7 @@ def start_system():
 def load_camera_settings():
     """Loads camera settings from database."""
     try:
-        settings = CameraSetting.query.all()
+        settings = CameraSetting.query.order_by(CameraSetting.id).all()
         return [setting.to_dict() for setting in settings]
     except Exception as e:
         print(f"Error loading camera settings: {e}")
@@ -366,7 +497,12 @@ def migrate_json_to_db():
                         source=camera_data.get('source', ''),
                         detections=camera_data.get('detections', ['motion', 'object', 'face']),
                         object_threshold=camera_data.get('objectThreshold', 0.5),
-                        motion_threshold=camera_data.get('motionThreshold', 30)
+                        motion_threshold=camera_data.get('motionThreshold', 30),
+                        motion_scale=camera_data.get('motionScale', 4),
+                        motion_min_area=camera_data.get('motionMinArea', 200),
+                        motion_zones=camera_data.get('motionZones'),
+                        motion_backend=camera_data.get('motionBackend', 'mog2'),
+                        continuous_recording=camera_data.get('continuousRecording', False)
                     )
                     db.session.add(setting)
             
@@ -471,8 +607,7 @@ def update_encodings(dataset_dirs=["../../data/datasets/dataset", "uploads"], en
                 print(f"[INFO] Added encoding for: {name}")
 
     data = {"encodings": known_encodings, "names": known_names}
-    with open(encodings_file, "wb") as f:
-        pickle.dump(data, f)
+    save_encodings(encodings_file, data)
     
     print(f"[INFO] Updated encodings.pickle with {len(known_encodings)} face encodings")
     print(f"[INFO] Known faces: {set(known_names)}")
@@ -578,66 +713,61 @@ def alerts():
 @app.route('/analytics')
 def analytics():
     try:
-        alerts = Alert.query.all()
-        
-        total_alerts = len(alerts)
-        critical_alerts = len([a for a in alerts if a.severity == 'Critical'])
-        active_cameras = len(set([a.camera for a in alerts if a.camera]))
+        from datetime import datetime, timedelta
+        import json
+
+        # Everything below reads the daily rollups, so the cost does not grow with the number of alerts
+        daily = AlertRollup.query.filter_by(period='day')
+
+        def counts_by(column):
+            rows = (db.session.query(column, db.func.sum(AlertRollup.count))
+                    .filter(AlertRollup.period == 'day', column != '')
+                    .group_by(column)
+                    .all())
+            return {label: int(count) for label, count in rows}
+
+        total_alerts = int(daily.with_entities(db.func.coalesce(db.func.sum(AlertRollup.count), 0)).scalar())
+        critical_alerts = int(daily.filter(AlertRollup.severity == 'Critical')
+                              .with_entities(db.func.coalesce(db.func.sum(AlertRollup.count), 0)).scalar())
+        active_cameras = daily.filter(AlertRollup.camera != '').with_entities(
+            db.func.count(db.distinct(AlertRollup.camera))).scalar()
         
         recent_alerts = Alert.query.order_by(Alert.id.desc()).limit(10).all()
         
-        severity_counts = {}
-        for alert in alerts:
-            if alert.severity:
-                severity = alert.severity
-                severity_counts[severity] = severity_counts.get(severity, 0) + 1
-        
+        severity_counts = counts_by(AlertRollup.severity)
         if not severity_counts:
             severity_counts = {'No Data': 1}
         
         severity_labels = list(severity_counts.keys())
         severity_data = list(severity_counts.values())
         
-        camera_counts = {}
-        for alert in alerts:
-            if alert.camera:
-                camera = alert.camera
-                camera_counts[camera] = camera_counts.get(camera, 0) + 1
-        
+        camera_counts = counts_by(AlertRollup.camera)
         if not camera_counts:
             camera_counts = {'No Data': 0}
         
         camera_labels = list(camera_counts.keys())
         camera_data = list(camera_counts.values())
         
-        location_counts = {}
-        for alert in alerts:
-            if alert.location:
-                location = alert.location
-                location_counts[location] = location_counts.get(location, 0) + 1
-        
+        location_counts = counts_by(AlertRollup.location)
         if not location_counts:
             location_counts = {'No Data': 0}
         
         location_labels = list(location_counts.keys())
         location_data = list(location_counts.values())
         
-        from datetime import datetime, timedelta
-        import json
-        
-        timeline_data = []
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        first_day = today - timedelta(days=6)
+        per_day = dict(db.session.query(AlertRollup.bucket, db.func.sum(AlertRollup.count))
+                       .filter(AlertRollup.period == 'day', AlertRollup.bucket >= first_day)
+                       .group_by(AlertRollup.bucket)
+                       .all())
+
         timeline_labels = []
-        
+        timeline_data = []
         for i in range(7):
-            day = datetime.now() - timedelta(days=i)
-            day_str = day.strftime('%Y-%m-%d')
+            day = first_day + timedelta(days=i)
             timeline_labels.append(day.strftime('%m/%d'))
-            
-            day_alerts = len([a for a in alerts if a.time and day_str in a.time])
-            timeline_data.append(day_alerts)
-        
-        timeline_labels.reverse()
-        timeline_data.reverse()
+            timeline_data.append(int(per_day.get(day, 0)))
         
         return render_template('analytics.html',
                              total_alerts=total_alerts,
@@ -718,54 +848,143 @@ def index():
         return redirect(url_for('dashboard'))
     return render_template('landing.html')
 
+# 🔹 Stats service: every counter in one conditional-aggregation query, cached for STATS_CACHE_SECONDS
+def count_where(condition):
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+
+def compute_alert_stats():
+    row = db.session.query(
+        db.func.count(Alert.id),
+        count_where(Alert.status == 'New'),
+        count_where(Alert.status == 'Acknowledged'),
+        count_where(Alert.status == 'Resolved'),
+        count_where(Alert.is_true_detection == True),
+        count_where(Alert.is_true_detection == False),
+        count_where(Alert.is_true_detection == None),
+    ).one()
+    total, new, acknowledged, resolved, true, false, unreviewed = (int(value) for value in row)
+    return {
+        "total": total,
+        "by_status": {"new": new, "acknowledged": acknowledged, "resolved": resolved},
+        "by_detection": {"true": true, "false": false, "unreviewed": unreviewed},
+    }
+
+
+def compute_user_stats():
+    total, admins, moderators = db.session.query(
+        db.func.count(User.id),
+        count_where(User.role == 'admin'),
+        count_where(User.role.in_(['moderator', 'admin'])),
+    ).one()
+    return {"total": int(total), "admins": int(admins), "moderators": int(moderators)}
+
+
+def alert_stats():
+    return stats_cache.get('alerts', compute_alert_stats)
+
+
+def user_stats():
+    return stats_cache.get('users', compute_user_stats)
+
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     camera_ids = [cam.source for cam in CameraSetting.query.all()]
-    alert_count = Alert.query.count()
-    
-    # Alert breakdown
-    new_alerts = Alert.query.filter_by(status='New').count()
-    acknowledged_alerts = Alert.query.filter_by(status='Acknowledged').count()
-    resolved_alerts = Alert.query.filter_by(status='Resolved').count()
-
-    # User stats
-    total_users = User.query.count()
-    admin_count = User.query.filter_by(role='admin').count()
-    moderator_count = User.query.filter(User.role.in_(['moderator', 'admin'])).count()
-
-    # Face encodings count
-    encodings_count = 0
+    alerts = alert_stats()
+    users = user_stats()
+
+    # Face encodings count, from the gallery's sidecar rather than the pickle itself
     encodings_path = os.path.join(app.root_path, '..', '..', 'config', 'encodings.pickle')
-    if os.path.exists(encodings_path):
-        with open(encodings_path, 'rb') as f:
-            data = pickle.load(f)
-            encodings_count = len(data.get("encodings", []))
+    encodings_count = gallery_meta(encodings_path)["count"]
 
     return render_template("dashboard.html",
                            camera_ids=camera_ids,
-                           alert_count=alert_count,
+                           alert_count=alerts["total"],
                            encodings_count=encodings_count,
-                           new_alerts=new_alerts,
-                           acknowledged_alerts=acknowledged_alerts,
-                           resolved_alerts=resolved_alerts,
-                           total_users=total_users,
-                           admin_count=admin_count,
-                           moderator_count=moderator_count,
+                           new_alerts=alerts["by_status"]["new"],
+                           acknowledged_alerts=alerts["by_status"]["acknowledged"],
+                           resolved_alerts=alerts["by_status"]["resolved"],
+                           total_users=users["total"],
+                           admin_count=users["admins"],
+                           moderator_count=users["moderators"],
                            system_running=is_system_running())
 
 
 # Updated API Route with filtering
+ALERTS_PAGE_SIZE = 50
+ALERTS_MAX_PAGE_SIZE = 500
+
+# Field name -> (columns it reads, how to render it from a result row)
+ALERT_API_FIELDS = {
+    "id": ((Alert.id,), lambda row: row.id),
+    "camera": ((Alert.camera,), lambda row: row.camera),
+    "location": ((Alert.location,), lambda row: row.location),
+    "time": ((Alert.time,), lambda row: row.time),
+    "message": ((Alert.message,), lambda row: row.message),
+    "severity": ((Alert.severity,), lambda row: row.severity),
+    "status": ((Alert.status,), lambda row: row.status),
+    "is_true_detection": ((Alert.is_true_detection,), lambda row: row.is_true_detection),
+    "reviewed_by": ((Alert.reviewed_by,), lambda row: row.reviewed_by),
+    "reviewed_at": ((Alert.reviewed_at,), lambda row: row.reviewed_at.isoformat() if row.reviewed_at else None),
+    "clip_url": ((Alert.clip_path,), lambda row: url_for('alert_clip', alert_id=row.id) if row.clip_path else None),
+    "image_url": ((Alert.image_path,), lambda row: url_for('alert_image', alert_id=row.id) if row.image_path else None),
+    "thumbnail_url": ((Alert.image_path,), lambda row: alert_thumbnail_url(row.id, row.image_path)),
+}
+
+
+def alert_thumbnail_url(alert_id, image_path):
+    """Thumbnail URL versioned by the thumbnail's cache key, so it can be cached as immutable"""
+    version = thumbnail_cache.version(resolve_data_path(image_path)) if image_path else None
+    return url_for('alert_thumbnail', alert_id=alert_id, v=version) if version else None
+
+
+def parse_alert_time(value):
+    """Accepts ISO dates/times for the created_at filters"""
+    return datetime.fromisoformat(value)
+
+
 @app.route('/api/alerts')
 @login_required
 def api_alerts():
+    """
+    One page of alerts, newest first.
+
+    Query parameters: ``status``, ``severity``, ``detection`` filters, ``since``
+    and ``until`` (ISO date/time), ``fields`` (comma-separated projection),
+    ``limit`` (default 50, max 500) and ``after_id``, the ``next_after_id``
+    returned by the previous page. Pages are found by id, not by offset, so
+    each one costs the same however deep the client has scrolled.
+
+    Returns ``{"alerts": [...], "next_after_id": <id or null>}``, streamed.
+    """
     # Get filter parameters
     status_filter = request.args.get('status', 'all')
     severity_filter = request.args.get('severity', 'all')
     detection_filter = request.args.get('detection', 'all')
-    
+
+    try:
+        limit = min(max(int(request.args.get('limit', ALERTS_PAGE_SIZE)), 1), ALERTS_MAX_PAGE_SIZE)
+        after_id = request.args.get('after_id', type=int)
+        since = parse_alert_time(request.args['since']) if request.args.get('since') else None
+        until = parse_alert_time(request.args['until']) if request.args.get('until') else None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid parameter: {e}"}), 400
+
+    fields = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()] or list(ALERT_API_FIELDS)
+    unknown = [name for name in fields if name not in ALERT_API_FIELDS]
+    if unknown:
+        return jsonify({"status": "error", "message": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    # Only read the columns the requested fields need (the id is always needed for paging)
+    columns = {'id': Alert.id}
+    for name in fields:
+        for column in ALERT_API_FIELDS[name][0]:
+            columns[column.key] = column
+
     # Build query
-    query = Alert.query
+    query = db.session.query(*columns.values())
     
     if status_filter != 'all':
         query = query.filter(Alert.status == status_filter)
@@ -780,25 +999,80 @@ def api_alerts():
             query = query.filter(Alert.is_true_detection == False)
         elif detection_filter == 'unreviewed':
             query = query.filter(Alert.is_true_detection == None)
-    
-    rows = query.order_by(Alert.id.desc()).all()
-    alerts_list = []
-    
-    for row in rows:
-        alerts_list.append({
-            "id": row.id,
-            "camera": row.camera,
-            "location": row.location,
-            "time": row.time,
-            "message": row.message,
-            "severity": row.severity,
-            "status": row.status,
-            "is_true_detection": row.is_true_detection,
-            "reviewed_by": row.reviewed_by,
-            "reviewed_at": row.reviewed_at.isoformat() if row.reviewed_at else None
-        })
-    
-    return jsonify(alerts_list)
+
+    if since:
+        query = query.filter(Alert.created_at >= since)
+    if until:
+        query = query.filter(Alert.created_at <= until)
+    if after_id is not None:
+        query = query.filter(Alert.id < after_id)
+
+    # One extra row tells whether another page follows
+    rows = query.order_by(Alert.id.desc()).limit(limit + 1)
+    renderers = [(name, ALERT_API_FIELDS[name][1]) for name in fields]
+
+    def generate():
+        yield '{"alerts": ['
+        count, last_id, next_after_id = 0, None, None
+        for row in rows.yield_per(100):
+            if count == limit:
+                next_after_id = last_id
+                break
+            yield (',' if count else '') + json.dumps({name: render(row) for name, render in renderers})
+            count += 1
+            last_id = row.id
+        yield '], "next_after_id": ' + json.dumps(next_after_id) + '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+def resolve_data_path(path):
+    """Paths stored by the detection processes are relative to the project root"""
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+@app.route('/api/alerts/<int:alert_id>/image')
+@login_required
+def alert_image(alert_id):
+    """Serve the full-size snapshot of an alert"""
+    alert = Alert.query.get_or_404(alert_id)
+    image_path = resolve_data_path(alert.image_path) if alert.image_path else None
+    if not image_path or not os.path.exists(image_path):
+        return jsonify({"status": "error", "message": "No image for this alert"}), 404
+    return send_file(image_path, mimetype='image/jpeg', conditional=True, max_age=86400)
+
+@app.route('/api/alerts/<int:alert_id>/thumbnail')
+@login_required
+def alert_thumbnail(alert_id):
+    """Serve a cached thumbnail of an alert's snapshot"""
+    alert = Alert.query.get_or_404(alert_id)
+    thumbnail = thumbnail_cache.get(resolve_data_path(alert.image_path)) if alert.image_path else None
+    if thumbnail is None:
+        return jsonify({"status": "error", "message": "No image for this alert"}), 404
+
+    data, mimetype, etag = thumbnail
+    if etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(data, mimetype=mimetype)
+    response.set_etag(etag)
+    if request.args.get('v') == etag:
+        # This URL can only ever serve this thumbnail
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/alerts/<int:alert_id>/clip')
+@login_required
+def alert_clip(alert_id):
+    """Serve the pre/post-event clip recorded for an alert"""
+    alert = Alert.query.get_or_404(alert_id)
+    if not alert.clip_path:
+        return jsonify({"status": "error", "message": "No clip for this alert"}), 404
+
+    clip_path = resolve_data_path(alert.clip_path)
+    if not os.path.exists(clip_path):
+        return jsonify({"status": "error", "message": "Clip file is missing"}), 404
+    return send_file(clip_path, mimetype='video/mp4', conditional=True)
 
 # New API route to update alert status
 @app.route('/api/alerts/<int:alert_id>/update', methods=['POST'])
@@ -816,6 +1090,7 @@ def update_alert(alert_id):
         alert.reviewed_at = datetime.now()
     
     db.session.commit()
+    stats_cache.invalidate('alerts')
     
     return jsonify({
         "success": True,
@@ -829,49 +1104,183 @@ def update_alert(alert_id):
         }
     })
 
-# Updated store_alert function
-def store_alert(camera, location, message, severity):
-    alert_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    new_alert = Alert(
-        camera=camera,
-        location=location,
-        time=alert_time,
-        message=message,
-        severity=severity,
-        status='New',  # Default status
-        is_true_detection=None  # Will be reviewed later
-    )
-    db.session.add(new_alert)
-    db.session.commit()
-    print(f"[INFO] Alert stored: {camera}, {location}, {alert_time}, {message}, {severity}")
+def rollup_keys(alert):
+    """The hourly and daily rollup keys an alert counts towards (none if its time cannot be parsed)"""
+    when = alert.created_at
+    if when is None:
+        try:
+            when = datetime.strptime(alert.time, "%Y-%m-%d %H:%M:%S")
+        except (TypeError, ValueError):
+            return []
+    labels = (alert.camera or '', alert.location or '', alert.severity or '')
+    return [('hour', when.replace(minute=0, second=0, microsecond=0)) + labels,
+            ('day', when.replace(hour=0, minute=0, second=0, microsecond=0)) + labels]
+
+
+def add_to_rollups(alerts):
+    """
+    Adds alerts to the rollup counts in the current session without committing,
+    so callers commit them together with the alerts themselves.
+    """
+    from collections import Counter
+    counts = Counter(key for alert in alerts for key in rollup_keys(alert))
+    if not counts:
+        return
+
+    dialect = db.engine.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        rows = [dict(zip(('period', 'bucket', 'camera', 'location', 'severity'), key), count=count)
+                for key, count in counts.items()]
+        statement = insert(AlertRollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=['period', 'bucket', 'camera', 'location', 'severity'],
+            set_={'count': AlertRollup.count + statement.excluded['count']})
+        db.session.execute(statement)
+        return
+
+    for (period, bucket, camera, location, severity), count in counts.items():
+        rollup = AlertRollup.query.filter_by(period=period, bucket=bucket, camera=camera,
+                                             location=location, severity=severity).first()
+        if rollup is None:
+            db.session.add(AlertRollup(period=period, bucket=bucket, camera=camera,
+                                       location=location, severity=severity, count=count))
+        else:
+            rollup.count += count
+
+
+def backfill_alert_rollups(batch_size=5000):
+    """Rebuilds the rollup table from every stored alert, reading them in id order one batch at a time"""
+    AlertRollup.query.delete()
+    last_id, total = 0, 0
+    while True:
+        batch = (Alert.query.filter(Alert.id > last_id).order_by(Alert.id).limit(batch_size).all())
+        if not batch:
+            break
+        add_to_rollups(batch)
+        db.session.commit()
+        last_id = batch[-1].id
+        total += len(batch)
+    print(f"[INFO] Alert rollups rebuilt from {total} alerts")
+    return total
+
+
+@app.cli.command('backfill-rollups')
+def backfill_rollups_command():
+    """Rebuild the alert rollup table (flask backfill-rollups)"""
+    backfill_alert_rollups()
+
 
 # API route to get alert statistics
 @app.route('/api/alerts/stats')
 @login_required
 def api_alert_stats():
-    total_alerts = Alert.query.count()
-    new_alerts = Alert.query.filter(Alert.status == 'New').count()
-    acknowledged_alerts = Alert.query.filter(Alert.status == 'Acknowledged').count()
-    resolved_alerts = Alert.query.filter(Alert.status == 'Resolved').count()
-    
-    true_detections = Alert.query.filter(Alert.is_true_detection == True).count()
-    false_detections = Alert.query.filter(Alert.is_true_detection == False).count()
-    unreviewed_detections = Alert.query.filter(Alert.is_true_detection == None).count()
-    
+    return jsonify(alert_stats())
+
+
+# ================================================================
+# API ROUTES - MOTION ANALYTICS
+# ================================================================
+
+@app.route('/api/motion/heatmap/<int:cam_id>')
+@login_required
+def motion_heatmap(cam_id):
+    """Render the decayed motion heatmap of a camera as a colour-mapped PNG"""
+    heatmap = load_heatmap(cam_id, base_dir=MOTION_ACTIVITY_DIR)
+    if heatmap is None:
+        return jsonify({"status": "error", "message": "No motion data for this camera"}), 404
+
+    heatmap = cv2.resize(heatmap, (FRAME_SHAPE[1], FRAME_SHAPE[0]), interpolation=cv2.INTER_LINEAR)
+    colored = cv2.applyColorMap((heatmap * 255).astype(np.uint8), cv2.COLORMAP_JET)
+    ret, png = cv2.imencode('.png', colored)
+    if not ret:
+        return jsonify({"status": "error", "message": "Failed to encode heatmap"}), 500
+    return Response(png.tobytes(), mimetype='image/png')
+
+@app.route('/api/motion/activity/<int:cam_id>')
+@login_required
+def motion_activity(cam_id):
+    """Per-minute mean motion activity of a camera for one day (?date=YYYY-MM-DD, default today)"""
+    date_str = request.args.get('date') or datetime.now().strftime('%Y-%m-%d')
+    try:
+        day = datetime.strptime(date_str, '%Y-%m-%d').strftime('%Y%m%d')
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid date, expected YYYY-MM-DD"}), 400
+
+    activity = load_activity(cam_id, day, base_dir=MOTION_ACTIVITY_DIR)
+    if activity is None:
+        return jsonify({"status": "error", "message": "No motion data for this day"}), 404
+
     return jsonify({
-        "total": total_alerts,
-        "by_status": {
-            "new": new_alerts,
-            "acknowledged": acknowledged_alerts,
-            "resolved": resolved_alerts
-        },
-        "by_detection": {
-            "true": true_detections,
-            "false": false_detections,
-            "unreviewed": unreviewed_detections
-        }
+        "status": "success",
+        "date": date_str,
+        "minutes": [round(float(value), 4) for value in activity]
+    })
+
+@app.route('/api/snapshots')
+@login_required
+def api_snapshots():
+    """List snapshots from the catalogue (?camera=&type=&since=&until= as epoch seconds, &limit=)"""
+    try:
+        camera = request.args.get('camera', type=int)
+        kind = request.args.get('type')
+        since = request.args.get('since', type=float)
+        until = request.args.get('until', type=float)
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+
+        catalogue = SnapshotCatalogue(SNAPSHOT_CATALOGUE_PATH)
+        try:
+            snapshots = catalogue.list(cam_id=camera, kind=kind, since=since, until=until, limit=limit)
+        finally:
+            catalogue.close()
+        return jsonify({"status": "success", "snapshots": snapshots})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/recordings/<int:camera_id>/seek')
+@login_required
+def seek_recording(camera_id):
+    """Locate the recorded segment and offset of a camera (by settings id) for a wall-clock time (?t=YYYY-MM-DDTHH:MM:SS)"""
+    try:
+        ts = datetime.fromisoformat(request.args.get('t', '')).timestamp()
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid time, expected ISO format"}), 400
+
+    index = RecordingIndex(RECORDING_INDEX_PATH)
+    try:
+        segment = index.locate(camera_id, ts)
+    finally:
+        index.close()
+    if segment is None:
+        return jsonify({"status": "error", "message": "Nothing recorded at that time"}), 404
+
+    return jsonify({
+        "status": "success",
+        "segment_id": segment["id"],
+        "offset": round(segment["offset"], 2),
+        "start": datetime.fromtimestamp(segment["start"]).isoformat(),
+        "url": url_for('recording_segment', segment_id=segment["id"])
     })
 
+@app.route('/api/recordings/segment/<int:segment_id>')
+@login_required
+def recording_segment(segment_id):
+    """Serve a recorded segment file"""
+    index = RecordingIndex(RECORDING_INDEX_PATH)
+    try:
+        segment = index.get(segment_id)
+    finally:
+        index.close()
+    if segment is None:
+        return jsonify({"status": "error", "message": "Segment not found"}), 404
+
+    path = resolve_data_path(segment["path"])
+    if not os.path.exists(path):
+        return jsonify({"status": "error", "message": "Segment file is missing"}), 404
+    return send_file(path, mimetype='video/mp4', conditional=True)
 
 # ================================================================
 # API ROUTES - CAMERA SETTINGS
@@ -887,27 +1296,47 @@ def get_camera_settings():
 @app.route('/api/save_camera_settings', methods=['POST'])
 @login_required
 def save_camera_settings():
-    """Save camera settings to database"""
+    """
+    Save camera settings to database.
+
+    The payload is diffed against the stored cameras by source: new cameras are
+    inserted, existing ones only get the fields present in the payload and only
+    when they differ, and missing ones are deleted, all in one transaction.
+    Unchanged cameras keep their rows and updated_at, so running workers only
+    reconfigure what actually changed.
+    """
     try:
         data = request.get_json()
         cameras = data.get("cameras", [])
-        
-        CameraSetting.query.delete()
-        
+
+        incoming = {}
         for camera_data in cameras:
             if isinstance(camera_data, dict):
-                setting = CameraSetting(
-                    source=camera_data.get('source', ''),
-                    detections=camera_data.get('detections', ['motion', 'object', 'face']),
-                    object_threshold=camera_data.get('objectThreshold', 0.5),
-                    motion_threshold=camera_data.get('motionThreshold', 30)
-                )
+                incoming[str(camera_data.get('source', ''))] = camera_data
+
+        existing = {setting.source: setting for setting in CameraSetting.query.all()}
+        changes = {"added": [], "updated": [], "removed": []}
+
+        for source, camera_data in incoming.items():
+            setting = existing.get(source)
+            if setting is None:
+                setting = CameraSetting(source=source, detections=['motion', 'object', 'face'])
+                setting.apply_dict(camera_data)
                 db.session.add(setting)
-        
+                changes["added"].append(source)
+            elif setting.apply_dict(camera_data):
+                setting.updated_at = datetime.utcnow()
+                changes["updated"].append(source)
+
+        for source, setting in existing.items():
+            if source not in incoming:
+                db.session.delete(setting)
+                changes["removed"].append(source)
+
         db.session.commit()
         
         updated_cameras = load_camera_settings()
-        return jsonify({"status": "success", "cameras": updated_cameras})
+        return jsonify({"status": "success", "cameras": updated_cameras, "changes": changes})
         
     except Exception as e:
         db.session.rollback()
@@ -938,14 +1367,8 @@ def update_single_camera_setting(source):
             setting = CameraSetting(source=source)
             db.session.add(setting)
         
-        if 'detections' in data:
-            setting.detections = data['detections']
-        if 'objectThreshold' in data:
-            setting.object_threshold = data['objectThreshold']
-        if 'motionThreshold' in data:
-            setting.motion_threshold = data['motionThreshold']
-        
-        setting.updated_at = datetime.utcnow()
+        if setting.apply_dict(data):
+            setting.updated_at = datetime.utcnow()
         db.session.commit()
         
         return jsonify({"status": "success", "camera": setting.to_dict()})
@@ -1004,6 +1427,7 @@ def add_user():
     try:
         db.session.add(new_user)
         db.session.commit()
+        stats_cache.invalidate('users')
         return jsonify({'status': 'success', 'message': 'User added successfully'})
     except Exception as e:
         db.session.rollback()
@@ -1025,6 +1449,7 @@ def delete_user():
     try:
         db.session.delete(user)
         db.session.commit()
+        stats_cache.invalidate('users')
         return jsonify({'status': 'success', 'message': 'User deleted successfully'})
     except Exception as e:
         db.session.rollback()
@@ -1050,11 +1475,45 @@ def update_user_role():
     try:
         user.role = new_role
         db.session.commit()
+        stats_cache.invalidate('users')
         return jsonify({'status': 'success', 'message': 'User role updated successfully'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'status': 'error', 'message': 'Failed to update user role'})
 
+@app.route('/api/update_user_notifications', methods=['POST'])
+@admin_required
+def update_user_notifications():
+    data = request.get_json()
+    username = data.get('username')
+    immediate = data.get('immediate')
+    digest_minutes = data.get('digestMinutes')
+
+    user = User.query.filter_by(username=username).first()
+    if not user:
+        return jsonify({'status': 'error', 'message': 'User not found'})
+
+    if immediate is not None and (not isinstance(immediate, list) or
+                                  any(severity not in ['high', 'medium', 'low'] for severity in immediate)):
+        return jsonify({'status': 'error', 'message': 'Immediate severities must be a list of high, medium or low'})
+
+    # bool is an int subclass, so true/false would otherwise pass as 1/0
+    if digest_minutes is not None and (not isinstance(digest_minutes, int) or isinstance(digest_minutes, bool)
+                                       or digest_minutes < 0):
+        return jsonify({'status': 'error', 'message': 'Digest interval must be a whole number of minutes'})
+
+    try:
+        # Only the keys sent are changed; an explicit null resets that one to the default
+        if 'immediate' in data:
+            user.notify_immediate = immediate
+        if 'digestMinutes' in data:
+            user.digest_minutes = digest_minutes
+        db.session.commit()
+        return jsonify({'status': 'success', 'message': 'Notification policy updated successfully'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'status': 'error', 'message': 'Failed to update notification policy'})
+
 @app.route('/api/toggle_user_status', methods=['POST'])
 @admin_required
 def toggle_user_status():
@@ -1178,6 +1637,7 @@ def register():
         try:
             db.session.add(new_user)
             db.session.commit()
+            stats_cache.invalidate('users')
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('login'))
         except Exception as e:
@@ -1197,5 +1657,8 @@ if __name__ == '__main__':
    # create_default_admin()
     with app.app_context():
         db.create_all()
+        # First run with rollups: build them from the alerts stored so far
+        if AlertRollup.query.first() is None and Alert.query.first() is not None:
+            backfill_alert_rollups()
     app.run(debug=True)
 
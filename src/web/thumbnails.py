@@ -0,0 +1,114 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class ThumbnailCache:
+    """
+    Lazily generated thumbnails for snapshot images.
+
+    Thumbnails are keyed by source path, modification time and size, stored on
+    disk under ``cache_dir`` and the most recently used ones are also kept in
+    memory. A changed source file gets a new key, so cached entries never go stale.
+    """
+
+    def __init__(self, cache_dir, width=240, quality=80, max_memory_items=256):
+        self.cache_dir = cache_dir
+        self.width = width
+        self.quality = quality
+        self.max_memory_items = max_memory_items
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+
+        # Prefer WebP, fall back to JPEG when OpenCV was built without it
+        ok, _ = cv2.imencode(".webp", np.zeros((8, 8, 3), dtype=np.uint8))
+        self.extension, self.mimetype = (".webp", "image/webp") if ok else (".jpg", "image/jpeg")
+
+    def _key(self, source_path, mtime_ns):
+        raw = f"{os.path.abspath(source_path)}|{mtime_ns}|{self.width}|{self.quality}".encode("utf-8")
+        return hashlib.sha1(raw).hexdigest()
+
+    def version(self, source_path):
+        """The key ``get`` would return for ``source_path``, without generating anything (None if it is missing)."""
+        try:
+            return self._key(source_path, os.stat(source_path).st_mtime_ns)
+        except OSError:
+            return None
+
+    def get(self, source_path):
+        """
+        Returns ``(data, mimetype, etag)`` for the thumbnail of ``source_path``,
+        or None if the source image is missing or unreadable.
+        """
+        try:
+            mtime_ns = os.stat(source_path).st_mtime_ns
+        except OSError:
+            return None
+        key = self._key(source_path, mtime_ns)
+
+        with self.lock:
+            data = self.memory.get(key)
+            if data is not None:
+                self.memory.move_to_end(key)
+                return data, self.mimetype, key
+
+        cache_path = os.path.join(self.cache_dir, key[:2], key + self.extension)
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                data = f.read()
+        else:
+            data = self._generate(source_path)
+            if data is None:
+                return None
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, cache_path)
+
+        with self.lock:
+            self.memory[key] = data
+            if len(self.memory) > self.max_memory_items:
+                self.memory.popitem(last=False)
+        return data, self.mimetype, key
+
+    def _generate(self, source_path):
+        image = cv2.imread(source_path)
+        if image is None:
+            return None
+        height, width = image.shape[:2]
+        if width > self.width:
+            image = cv2.resize(image, (self.width, max(1, height * self.width // width)), interpolation=cv2.INTER_AREA)
+
+        params = [cv2.IMWRITE_WEBP_QUALITY if self.extension == ".webp" else cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        ok, buffer = cv2.imencode(self.extension, image, params)
+        return buffer.tobytes() if ok else None
+
+
+def prune_thumbnails(cache_dir, max_age_days):
+    """
+    Deletes cached thumbnails not written for ``max_age_days``.
+
+    Run with the snapshot retention age, so thumbnails go at most one
+    retention period after the snapshots they were made from.
+
+    Returns:
+        int: the number of files deleted.
+    """
+    cutoff = time.time() - max_age_days * 86400
+    deleted = 0
+    for root, _, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    deleted += 1
+            except OSError:
+                pass
+    return deleted
@@ -0,0 +1,43 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    A small in-process cache whose entries expire after ``ttl`` seconds.
+
+    Meant for values that are expensive to compute and polled often, such as
+    dashboard counters. Writers in this process call ``invalidate`` so their
+    own changes show up at once; changes made by other processes show up once
+    the entry expires.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = {}  # key -> (expires_at, value)
+        self.generation = 0  # Bumped by invalidate, so a value computed before it is not stored
+        self.lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Returns the cached value for ``key``, calling ``compute()`` when it is missing or expired."""
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            generation = self.generation
+        # Computed outside the lock; concurrent misses may both compute, which is harmless
+        value = compute()
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self, key=None):
+        """Drops ``key``, or every entry when no key is given."""
+        with self.lock:
+            self.generation += 1
+            if key is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(key, None)